@@ -0,0 +1,89 @@
+import sys
+import time
+from datetime import datetime, timezone
+
+# Guild IDs repeat across many records, so every record shares one int object per guild
+_guild_ids = {}
+
+
+class AFKRecord:
+    """One user's AFK status, kept small: an interned reason, epoch seconds and a shared guild ID"""
+
+    __slots__ = ('reason', 'since', 'guild_id')
+
+    def __init__(self, reason, since, guild_id=None):
+        self.reason = sys.intern(reason)
+        self.since = int(since)
+        self.guild_id = _guild_ids.setdefault(guild_id, guild_id)
+
+    @property
+    def time(self):
+        return datetime.fromtimestamp(self.since, timezone.utc)
+
+    def to_row(self):
+        """The plain row persistence backends store"""
+        return {'reason': self.reason, 'time': datetime.utcfromtimestamp(self.since), 'guild_id': self.guild_id}
+
+    @classmethod
+    def from_row(cls, row):
+        since = row['time'].replace(tzinfo=timezone.utc).timestamp()
+        return cls(row['reason'], since, row.get('guild_id'))
+
+
+class AFKStore(dict):
+    """AFK records by user ID, with optional expiry.
+
+    Records are inserted in the order users went AFK, so the oldest ones
+    are always at the front and an expiry sweep stops at the first record
+    that is still fresh instead of scanning every user.
+    """
+
+    def __init__(self, ttl=0):
+        super().__init__()
+        self.ttl = ttl
+
+    def load(self, records):
+        """Insert records restored from storage, keeping the store ordered by since"""
+        newest = next(reversed(self.values())).since if self else None
+        for user_id in records:
+            # Re-inserting moves the user, assigning would keep their old position
+            self.pop(user_id, None)
+        ordered = sorted(records.items(), key=lambda item: item[1].since)
+        self.update(ordered)
+        if ordered and newest is not None and ordered[0][1].since < newest:
+            # Older than records already here, so the whole store has to be reordered
+            items = sorted(self.items(), key=lambda item: item[1].since)
+            self.clear()
+            self.update(items)
+
+    def expired(self, now=None):
+        """User IDs whose AFK status is older than the TTL, oldest first"""
+        if not self.ttl:
+            return []
+        cutoff = (now or time.time()) - self.ttl
+        expired = []
+        for user_id, record in self.items():
+            if record.since > cutoff:
+                break
+            expired.append(user_id)
+        return expired
+
+    def memory_report(self):
+        """Approximate memory held by the store, in bytes"""
+        # Every record holds its own epoch int; reasons and guild IDs are shared
+        record_bytes = len(self) * (AFKRecord.__basicsize__ + sys.getsizeof(int(time.time())))
+        # User IDs are 64-bit snowflakes, all the same size as ints
+        key_bytes = len(self) * sys.getsizeof(1 << 62)
+        reasons = {id(record.reason): record.reason for record in self.values()}
+        shared_bytes = sum(sys.getsizeof(reason) for reason in reasons.values())
+        shared_bytes += sum(sys.getsizeof(guild_id) for guild_id in _guild_ids if guild_id is not None)
+        table_bytes = sys.getsizeof(self)
+        return {
+            'users': len(self),
+            'unique_reasons': len(reasons),
+            'table_bytes': table_bytes,
+            'record_bytes': record_bytes,
+            'key_bytes': key_bytes,
+            'shared_bytes': shared_bytes,
+            'total_bytes': table_bytes + record_bytes + key_bytes + shared_bytes,
+        }
@@ -0,0 +1,419 @@
+"""Offline benchmark for the sticky, AFK and notification hot paths.
+
+Drives the real handlers in main.py against an in-process stand-in for the
+Discord gateway and REST API. Nothing touches the network: REST calls are
+recorded, delayed by a simulated latency and occasionally answered with a
+429 that is retried the way discord.py retries them.
+
+    python bench.py
+    python bench.py --channels 50 --messages 20000 --latency 40 --ratelimit 0.01 --mode instant
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# Keep the benchmark from touching the real database
+os.environ.setdefault('STATE_STORE', 'memory')
+
+import discord
+
+import main
+import metrics
+from notifier import PresenceDebouncer
+
+_snowflakes = itertools.count(1 << 40)
+
+
+def next_id():
+    return next(_snowflakes)
+
+
+class FakeRest:
+    """Records REST calls, simulates latency and 429 responses"""
+
+    def __init__(self, latency=0.03, jitter=0.5, ratelimit_rate=0.0, retry_after=0.05, rng=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.ratelimit_rate = ratelimit_rate
+        self.retry_after = retry_after
+        self.rng = rng or random.Random()
+        self.calls = Counter()
+        self.sent = Counter()  # {channel_id: messages sent}
+        self.rate_limited = 0
+        self.messages = set()
+
+    async def request(self, route):
+        self.calls[route] += 1
+        # discord.py sleeps out a 429 and retries, so the caller only sees the delay
+        while self.rng.random() < self.ratelimit_rate:
+            self.rate_limited += 1
+            metrics.rate_limits.inc(route)
+            await asyncio.sleep(self.retry_after)
+        if self.latency:
+            spread = self.latency * self.jitter
+            await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-spread, spread)))
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+
+def http_error(cls, status, reason):
+    return cls(SimpleNamespace(status=status, reason=reason), reason)
+
+
+class FakeUser:
+    def __init__(self, user_id, name, bot=False, manage_messages=False):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{user_id}>"
+        self.bot = bot
+        self.avatar = None
+        self.default_avatar = SimpleNamespace(url="https://cdn.discordapp.com/embed/avatars/0.png")
+        self.display_avatar = self.default_avatar
+        self.created_at = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        self.joined_at = datetime(2021, 1, 1, tzinfo=timezone.utc)
+        self.status = discord.Status.offline
+        self.guild = None
+        self.guild_permissions = SimpleNamespace(manage_messages=manage_messages)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeUser) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakePartialMessage:
+    def __init__(self, channel, message_id):
+        self.channel = channel
+        self.id = message_id
+
+    async def delete(self):
+        rest = self.channel.rest
+        await rest.request('DELETE /channels/{channel_id}/messages/{message_id}')
+        if self.id not in rest.messages:
+            raise http_error(discord.NotFound, 404, 'Unknown Message')
+        rest.messages.discard(self.id)
+
+
+class FakeWebhook:
+    def __init__(self, channel):
+        self.id = next_id()
+        self.token = f"token-{self.id}"
+        self.channel = channel
+
+    async def send(self, *, embed=None, username=None, avatar_url=None, wait=False):
+        rest = self.channel.rest
+        await rest.request('POST /webhooks/{webhook_id}/{webhook_token}')
+        message = FakePartialMessage(self.channel, next_id())
+        message.webhook_id = self.id
+        rest.messages.add(message.id)
+        return message
+
+    async def delete_message(self, message_id):
+        rest = self.channel.rest
+        await rest.request('DELETE /webhooks/{webhook_id}/{webhook_token}/messages/{message_id}')
+        if message_id not in rest.messages:
+            raise http_error(discord.NotFound, 404, 'Unknown Message')
+        rest.messages.discard(message_id)
+
+    async def delete(self, reason=None):
+        await self.channel.rest.request('DELETE /webhooks/{webhook_id}')
+
+
+class FakeChannel:
+    def __init__(self, guild, rest, name, position, channel_id=None):
+        self.id = channel_id or next_id()
+        self.guild = guild
+        self.rest = rest
+        self.name = name
+        self.position = position
+        self.mention = f"<#{self.id}>"
+
+    async def send(self, content=None, *, embed=None, embeds=None, view=None, delete_after=None):
+        await self.rest.request('POST /channels/{channel_id}/messages')
+        self.rest.sent[self.id] += 1
+        message_id = next_id()
+        # Messages sent with delete_after are cleaned up by discord.py in the background
+        if delete_after is None:
+            self.rest.messages.add(message_id)
+        return FakePartialMessage(self, message_id)
+
+    def get_partial_message(self, message_id):
+        return FakePartialMessage(self, message_id)
+
+    async def create_webhook(self, name, reason=None):
+        await self.rest.request('POST /channels/{channel_id}/webhooks')
+        webhook = FakeWebhook(self)
+        self.guild.webhooks[webhook.id] = webhook
+        return webhook
+
+
+class FakeGuild:
+    def __init__(self, rest, channels, guild_id=None):
+        self.id = guild_id or next_id()
+        self.name = f"guild-{self.id}"
+        self.icon = None
+        self.text_channels = [FakeChannel(self, rest, f"channel-{i}", i) for i in range(channels)]
+        self.channels = list(self.text_channels)
+        self._channels = {channel.id: channel for channel in self.channels}
+        self.system_channel = None
+        self.members = []
+        self.webhooks = {}
+
+    @property
+    def member_count(self):
+        return len(self.members)
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+
+class FakeResponse:
+    def __init__(self, rest):
+        self.rest = rest
+
+    async def send_message(self, *args, **kwargs):
+        await self.rest.request('POST /interactions/{interaction_id}/{token}/callback')
+
+    async def edit_message(self, *args, **kwargs):
+        await self.rest.request('POST /interactions/{interaction_id}/{token}/callback')
+
+    async def defer(self, *args, **kwargs):
+        await self.rest.request('POST /interactions/{interaction_id}/{token}/callback')
+
+
+class FakeFollowup:
+    def __init__(self, rest):
+        self.rest = rest
+
+    async def send(self, *args, **kwargs):
+        await self.rest.request('POST /webhooks/{application_id}/{token}')
+
+
+class FakeInteraction:
+    def __init__(self, user, channel):
+        self.user = user
+        self.channel = channel
+        self.guild = channel.guild
+        self.guild_id = channel.guild.id
+        self.response = FakeResponse(channel.rest)
+        self.followup = FakeFollowup(channel.rest)
+
+
+class FakeMessage:
+    # Command processing builds a Context, which reads the connection state off the message
+    _state = main.bot._connection
+    webhook_id = None
+
+    def __init__(self, author, channel, content="hello", mentions=()):
+        self.id = next_id()
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.mentions = list(mentions)
+
+
+class FakeGateway:
+    """Stands in for the gateway: logs the bot in and dispatches events to its handlers"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.latencies = {}
+        self.errors = Counter()
+
+    def connect(self, bot_user):
+        # What discord.py would learn from READY
+        self.bot._connection.user = bot_user
+
+    async def dispatch(self, name, handler, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            await handler(*args, **kwargs)
+        except Exception as e:
+            self.errors[f"{name}: {type(e).__name__}: {e}"] += 1
+        finally:
+            self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def handler_stats(gateway):
+    return {
+        name: {
+            'count': len(values),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+            'mean_ms': round(statistics.fmean(values) * 1000, 3),
+        }
+        for name, values in gateway.latencies.items()
+    }
+
+
+async def drain():
+    """Wait for pending sticky reposts, presence notices, notification batches and queued sends"""
+    while True:
+        if main.presence_notices.pending or len(main.outbound) or main.outbound.active:
+            await asyncio.sleep(0.05)
+            continue
+        tasks = [state['task'] for state in main.sticky_repost_state.values() if state['task']]
+        if main.notifier.task and not main.notifier.task.done():
+            tasks.append(main.notifier.task)
+        if not tasks:
+            return
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    rest = FakeRest(args.latency / 1000, ratelimit_rate=args.ratelimit, rng=rng)
+    gateway = FakeGateway(main.bot)
+    gateway.connect(FakeUser(next_id(), "StickyBot", bot=True))
+
+    guild = FakeGuild(rest, args.channels)
+    notify_channel = FakeChannel(guild, rest, "notify", -1, channel_id=main.NOTIFY_CHANNEL_ID)
+    main.notifier.get_channel = lambda: notify_channel
+    # Handlers look channels up in the bot's cache, which here is the fake guild
+    main.bot.get_channel = lambda channel_id: notify_channel if channel_id == notify_channel.id else guild.get_channel(channel_id)
+    main.presence_notices = PresenceDebouncer(main.push_presence_notice, window=args.presence_window)
+    admin = FakeUser(next_id(), "admin", manage_messages=True)
+    users = [FakeUser(next_id(), f"user-{i}") for i in range(args.users)]
+    for user in users:
+        user.guild = guild
+    guild.members = list(users)
+
+    quiet_period = args.quiet_period if args.mode == 'debounce' else None
+    max_delay = args.max_delay if args.mode == 'debounce' else None
+
+    # /stick on every channel
+    started = time.perf_counter()
+    for channel in guild.text_channels:
+        await gateway.dispatch('/stick', main.stick_message.callback, FakeInteraction(admin, channel),
+                               f"Please read the rules of #{channel.name}", mode=args.mode, quiet_period=quiet_period,
+                               max_delay=max_delay, delivery=args.delivery)
+
+    # Some users go AFK so mentions exercise the AFK path
+    for user in users[:args.afk_users]:
+        await main.afk_slash.callback(FakeInteraction(user, guild.text_channels[0]), "benchmarking")
+    afk_targets = users[:args.afk_users]
+
+    # Message traffic, arriving at the requested rate
+    interval = 1 / args.rate if args.rate else 0
+    calls_before_messages = rest.total_calls()
+    message_started = time.perf_counter()
+    for i in range(args.messages):
+        author = rng.choice(users[args.afk_users:] or users)
+        mentions = rng.sample(afk_targets, min(len(afk_targets), 3)) if afk_targets and rng.random() < args.mention_rate else ()
+        message = FakeMessage(author, rng.choice(guild.text_channels), mentions=mentions)
+        asyncio.create_task(gateway.dispatch('on_message', main.on_message, message))
+        if interval:
+            await asyncio.sleep(interval)
+        elif i % 100 == 0:
+            await asyncio.sleep(0)
+    # Let the in-flight handlers and reposts finish
+    while len(gateway.latencies.get('on_message', ())) < args.messages:
+        await asyncio.sleep(0.01)
+    await drain()
+    message_elapsed = time.perf_counter() - message_started
+    message_calls = rest.total_calls() - calls_before_messages
+
+    # Presence and member churn
+    for i in range(args.presence_events):
+        user = rng.choice(users)
+        before = SimpleNamespace(status=user.status)
+        user.status = discord.Status.online if user.status == discord.Status.offline else discord.Status.offline
+        await gateway.dispatch('on_presence_update', main.on_presence_update, before, user)
+    for i in range(args.member_events):
+        member = FakeUser(next_id(), f"joiner-{i}")
+        member.guild = guild
+        guild.members.append(member)
+        await gateway.dispatch('on_member_join', main.on_member_join, member)
+        guild.members.remove(member)
+        await gateway.dispatch('on_member_remove', main.on_member_remove, member)
+    await drain()
+    if args.presence_events or args.member_events:
+        assert rest.sent[notify_channel.id], "Presence and member events never reached the notify channel"
+
+    # /stickremove on every channel
+    for channel in guild.text_channels:
+        await gateway.dispatch('/stickremove', main.stick_remove.callback, FakeInteraction(admin, channel))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'config': vars(args),
+        'elapsed_seconds': round(elapsed, 3),
+        'messages_per_second': round(args.messages / message_elapsed, 1) if message_elapsed else None,
+        'rest_calls_per_message': round(message_calls / args.messages, 3) if args.messages else None,
+        'rest_calls': dict(rest.calls),
+        'notify_sends': rest.sent[notify_channel.id],
+        'rate_limited': rest.rate_limited,
+        'errors': dict(gateway.errors),
+        'handlers': handler_stats(gateway),
+    }
+
+
+def print_report(report):
+    print(f"Elapsed:               {report['elapsed_seconds']}s")
+    print(f"Messages/sec:          {report['messages_per_second']}")
+    print(f"REST calls/message:    {report['rest_calls_per_message']}")
+    print(f"Simulated 429s:        {report['rate_limited']}")
+    if 'notify_sends' in report:
+        print(f"Notify channel sends:  {report['notify_sends']}")
+    for error, count in report['errors'].items():
+        print(f"Handler error x{count}: {error}")
+    print("REST calls by route:")
+    for route, count in sorted(report['rest_calls'].items(), key=lambda item: -item[1]):
+        print(f"  {count:>8}  {route}")
+    print(f"{'Handler':<22}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name, stats in report['handlers'].items():
+        print(f"{name:<22}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p99_ms']:>10}{stats['mean_ms']:>10}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bot's handlers against a fake Discord")
+    parser.add_argument('--channels', type=int, default=20, help="Sticky channels in the fake guild")
+    parser.add_argument('--users', type=int, default=200, help="Members in the fake guild")
+    parser.add_argument('--messages', type=int, default=5000, help="Messages to dispatch")
+    parser.add_argument('--rate', type=float, default=0, help="Messages per second to dispatch (0 = as fast as possible)")
+    parser.add_argument('--mode', choices=sorted(main.STICKY_REPOST_MODES), default=main.DEFAULT_STICKY_MODE)
+    parser.add_argument('--delivery', choices=main.STICKY_DELIVERY_MODES, default='bot', help="How stickies are posted")
+    parser.add_argument('--quiet-period', type=float, default=0.2, help="Debounce quiet period in seconds")
+    parser.add_argument('--max-delay', type=float, default=1.0, help="Debounce max delay in seconds")
+    parser.add_argument('--afk-users', type=int, default=10, help="Users who go AFK before the run")
+    parser.add_argument('--mention-rate', type=float, default=0.05, help="Fraction of messages mentioning AFK users")
+    parser.add_argument('--presence-events', type=int, default=1000)
+    parser.add_argument('--member-events', type=int, default=200)
+    parser.add_argument('--presence-window', type=float, default=0.5, help="Seconds presence changes are debounced for")
+    parser.add_argument('--latency', type=float, default=30, help="Simulated REST latency in milliseconds")
+    parser.add_argument('--ratelimit', type=float, default=0.0, help="Probability that a REST call gets a 429")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+
+class BulkJob:
+    """Runs an action over many items in the background with bounded concurrency.
+
+    A fixed pool of workers pulls items from a shared iterator, so at most
+    `concurrency` actions are in flight however many items there are. While
+    the job runs, on_progress(job) is awaited every progress_interval
+    seconds and once more when it finishes. A failing item is recorded and
+    does not stop the rest of the job.
+    """
+
+    def __init__(self, name, items, action, concurrency=4, on_progress=None, progress_interval=2.0):
+        self.name = name
+        self.items = list(items)
+        self.action = action
+        self.concurrency = concurrency
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.done = 0
+        self.failed = []  # [(item, error)]
+        self.started = None
+        self.finished = None
+        self.cancelled = False
+        self.task = None
+
+    @property
+    def total(self):
+        return len(self.items)
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+        return self.task
+
+    def cancel(self):
+        if self.running:
+            self.cancelled = True
+            self.task.cancel()
+
+    async def _worker(self, items):
+        for item in items:
+            try:
+                await self.action(item)
+            except Exception as e:
+                self.failed.append((item, e))
+            self.done += 1
+
+    async def _report(self):
+        if self.on_progress is None:
+            return
+        try:
+            await self.on_progress(self)
+        except Exception as e:
+            print(f"Failed to report progress of {self.name}: {e}")
+
+    async def _run(self):
+        self.started = time.monotonic()
+        items = iter(self.items)
+        workers = asyncio.gather(*(self._worker(items) for _ in range(max(1, self.concurrency))))
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(asyncio.shield(workers), timeout=self.progress_interval)
+                    break
+                except asyncio.TimeoutError:
+                    await self._report()
+        except asyncio.CancelledError:
+            workers.cancel()
+            raise
+        finally:
+            self.finished = time.monotonic()
+            await asyncio.shield(self._report())
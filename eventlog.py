@@ -0,0 +1,105 @@
+"""Compact on-disk log of gateway events, for replaying real traffic offline.
+
+Every event is one JSON array per line in a gzip stream, starting with the
+milliseconds since capture began and a one-letter kind:
+
+    [ms, 's', {...}]                                           state snapshot
+    [ms, 'm', guild_id, channel_id, author_id, bot, webhook_id, [mention_ids], length]
+    [ms, 'p', guild_id, user_id, before_status, after_status]
+    [ms, 'j', guild_id, user_id]                               member joined
+    [ms, 'l', guild_id, user_id]                               member left
+    [ms, 'a', guild_id, user_id]                               user went AFK
+
+Only IDs and shapes are kept: no message content, names or AFK reasons are
+written to disk. The stream is flushed every flush_interval seconds so a
+capture that is cut short still replays up to its last flush.
+
+Each capture is a file of its own, so its clock and snapshot never mix with
+another run's; capture_path() names one per process start.
+"""
+import gzip
+import json
+import os
+import time
+import zlib
+
+SNAPSHOT = 's'
+MESSAGE = 'm'
+PRESENCE = 'p'
+MEMBER_JOIN = 'j'
+MEMBER_LEAVE = 'l'
+AFK = 'a'
+
+
+def capture_path(path, started=None, pid=None):
+    """events.log.gz -> events-20240101-120000-1234.log.gz, unique per process start"""
+    directory, name = os.path.split(path)
+    stem, dot, extension = name.partition('.')
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(started))
+    return os.path.join(directory, f"{stem}-{stamp}-{pid or os.getpid()}{dot}{extension}")
+
+
+class EventRecorder:
+    """Writes gateway events to a new gzip'd event log"""
+
+    def __init__(self, path, flush_interval=5.0, clock=time.monotonic):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.clock = clock
+        # Never appends: a second capture in one file would restart the clock mid-log
+        self.file = gzip.open(path, 'xt', encoding='utf-8')
+        self.started = clock()
+        self.flushed = self.started
+        self.events = 0
+        self.snapshotted = False
+
+    def _write(self, kind, *fields):
+        now = self.clock()
+        self.file.write(json.dumps([int((now - self.started) * 1000), kind, *fields], separators=(',', ':')))
+        self.file.write('\n')
+        self.events += 1
+        if now - self.flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        # A sync flush makes everything written so far readable without closing the stream
+        self.file.flush()
+        self.file.buffer.flush(zlib.Z_SYNC_FLUSH)
+        self.flushed = self.clock()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def snapshot(self, stickies, afk):
+        """Record the stickies and AFK users the captured traffic runs against, once per capture"""
+        if self.snapshotted:
+            return
+        self.snapshotted = True
+        self._write(SNAPSHOT, {'stickies': stickies, 'afk': afk})
+
+    def message(self, message):
+        guild_id = message.guild.id if message.guild else None
+        self._write(MESSAGE, guild_id, message.channel.id, message.author.id, message.author.bot,
+                    message.webhook_id, [mention.id for mention in message.mentions], len(message.content or ''))
+
+    def presence(self, before, after):
+        self._write(PRESENCE, after.guild.id, after.id, str(before.status), str(after.status))
+
+    def member(self, member, joined):
+        self._write(MEMBER_JOIN if joined else MEMBER_LEAVE, member.guild.id, member.id)
+
+    def afk(self, guild_id, user_id):
+        self._write(AFK, guild_id, user_id)
+
+
+def read_events(path):
+    """Yield the events in a log; a capture cut short ends at its last complete line"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                if line.endswith('\n'):
+                    yield json.loads(line)
+        except EOFError:
+            # The recorder never closed the stream; everything before the last flush is intact
+            return
@@ -0,0 +1,95 @@
+"""Minimal in-process stand-in for the Redis-protocol server behind the 'kv' state store.
+
+    python kvserver.py --port 6379
+    STATE_STORE=kv STATE_STORE_PATH=redis://127.0.0.1:6379 python main.py
+
+It keeps everything in memory and understands only the commands the bot
+sends (hashes, publish/subscribe, PING, SELECT, AUTH), which is enough to
+run several bot processes against each other locally.
+"""
+import argparse
+import asyncio
+
+from storage import KVError, _encode_command, _read_reply_async
+
+
+def _encode_reply(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, KVError):
+        return b'-%s\r\n' % str(value).encode()
+    if isinstance(value, str):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, bytes):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    return b'*%d\r\n' % len(value) + b''.join(_encode_reply(item) for item in value)
+
+
+class KVServer:
+    def __init__(self):
+        self.hashes = {}
+        self.subscribers = {}  # {channel: set(writer)}
+
+    def command(self, name, args, writer):
+        if name == 'PING':
+            return 'PONG'
+        if name in ('SELECT', 'AUTH'):
+            return 'OK'
+        if name == 'HSET':
+            fields = self.hashes.setdefault(args[0], {})
+            added = 0
+            for i in range(1, len(args) - 1, 2):
+                added += args[i] not in fields
+                fields[args[i]] = args[i + 1]
+            return added
+        if name == 'HDEL':
+            fields = self.hashes.get(args[0], {})
+            return sum(fields.pop(key, None) is not None for key in args[1:])
+        if name == 'HGET':
+            return self.hashes.get(args[0], {}).get(args[1])
+        if name == 'HGETALL':
+            return [part for item in self.hashes.get(args[0], {}).items() for part in item]
+        if name == 'PUBLISH':
+            receivers = self.subscribers.get(args[0], set())
+            for receiver in receivers:
+                receiver.write(_encode_command(b'message', args[0], args[1]))
+            return len(receivers)
+        if name == 'SUBSCRIBE':
+            for channel in args:
+                self.subscribers.setdefault(channel, set()).add(writer)
+            return [b'subscribe', args[-1], len(args)]
+        return KVError(f"ERR unknown command '{name}'")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await _read_reply_async(reader)
+                name, args = request[0].decode().upper(), request[1:]
+                writer.write(_encode_reply(self.command(name, args, writer)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for receivers in self.subscribers.values():
+                receivers.discard(writer)
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=6379):
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def _main(host, port):
+    server = await KVServer().serve(host, port)
+    print(f"Serving on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the shared state server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+    asyncio.run(_main(args.host, args.port))
@@ -0,0 +1,103 @@
+"""Run the bot as several worker processes, each owning a range of shards.
+
+    DISCORD_TOKEN=... python launcher.py --processes 4
+    DISCORD_TOKEN=... python launcher.py --shards 32 --processes 4
+
+Each worker is a plain `python main.py` with SHARD_COUNT and SHARD_IDS set,
+so it only connects its own shards and only loads the stickies for guilds
+on those shards. AFK statuses are loaded by every worker, since a user can
+return in a guild another worker owns; for a status cleared by one worker
+to reach the others, run them on the shared store (STATE_STORE=kv).
+Workers that exit are restarted.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+
+def fetch_recommended_shards(token):
+    """Ask Discord how many shards this bot should run"""
+    request = urllib.request.Request(
+        'https://discord.com/api/v10/gateway/bot',
+        headers={'Authorization': f'Bot {token}', 'User-Agent': 'DiscordBot (launcher, 1.0)'}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)['shards']
+
+
+def shard_ranges(shard_count, processes):
+    """Split shard IDs into contiguous, evenly sized ranges"""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def spawn_worker(shard_ids, shard_count):
+    env = dict(os.environ, SHARD_COUNT=str(shard_count), SHARD_IDS=','.join(map(str, shard_ids)))
+    return subprocess.Popen([sys.executable, MAIN_SCRIPT], env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot across multiple shard worker processes")
+    parser.add_argument('--shards', type=int, default=0, help="Total shard count (default: Discord's recommendation)")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument('--restart-delay', type=float, default=5.0, help="Seconds to wait before restarting a worker")
+    args = parser.parse_args()
+
+    shard_count = args.shards
+    if not shard_count:
+        token = os.getenv('DISCORD_TOKEN')
+        if not token:
+            parser.error("DISCORD_TOKEN must be set to look up the recommended shard count")
+        shard_count = fetch_recommended_shards(token)
+
+    ranges = shard_ranges(shard_count, args.processes)
+    if len(ranges) > 1 and os.getenv('STATE_STORE', 'sqlite') != 'kv':
+        print("Warning: workers only see each other's AFK changes with STATE_STORE=kv")
+    print(f"Starting {len(ranges)} worker(s) for {shard_count} shard(s)")
+
+    workers = {}
+    for shard_ids in ranges:
+        workers[tuple(shard_ids)] = spawn_worker(shard_ids, shard_count)
+        print(f"Worker {workers[tuple(shard_ids)].pid}: shards {shard_ids[0]}-{shard_ids[-1]}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        # Workers flush their write-behind state on SIGINT, like a Ctrl+C
+        for process in workers.values():
+            process.send_signal(signal.SIGINT)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while not stopping:
+        time.sleep(1)
+        for shard_ids, process in list(workers.items()):
+            if process.poll() is None or stopping:
+                continue
+            print(f"Worker for shards {shard_ids[0]}-{shard_ids[-1]} exited with {process.returncode}, restarting")
+            time.sleep(args.restart_delay)
+            workers[shard_ids] = spawn_worker(list(shard_ids), shard_count)
+
+    for process in workers.values():
+        process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import metrics
+
+# Degraded tiers, each one also applying everything below it
+TIER_NORMAL = 0
+TIER_PAUSE_PRESENCE = 1
+TIER_SLOW_STICKIES = 2
+TIER_SUSPEND_AFK = 3
+
+TIER_NAMES = {
+    TIER_NORMAL: 'normal',
+    TIER_PAUSE_PRESENCE: 'presence notices paused',
+    TIER_SLOW_STICKIES: 'sticky reposts slowed',
+    TIER_SUSPEND_AFK: 'AFK notices suspended',
+}
+
+loop_lag = metrics.REGISTRY.histogram(
+    'bot_event_loop_lag_seconds', 'How late the event loop ran a timer scheduled by the load monitor'
+)
+load_tier = metrics.REGISTRY.gauge(
+    'bot_load_tier', 'Current degraded tier, 0 when running normally'
+)
+tier_changes = metrics.REGISTRY.counter(
+    'bot_load_tier_changes_total', 'Degraded tier changes', labels=('direction',)
+)
+
+
+class LoadMonitor:
+    """Watches event-loop lag and queue depth and picks a degraded tier.
+
+    Every interval the monitor measures how late its own sleep woke up and
+    asks depth() how much work is queued. Tier N is due once the smoothed
+    lag reaches lag_thresholds[N - 1] or the depth reaches
+    depth_thresholds[N - 1]. The monitor escalates as soon as a higher tier
+    is due, but only steps down one tier at a time, after the load has stayed
+    below the current tier for recover_after seconds, so it does not flap
+    at a threshold.
+    """
+
+    def __init__(self, depth, lag_thresholds=(0.1, 0.25, 0.5), depth_thresholds=(200, 500, 1000),
+                 interval=0.5, recover_after=10.0, smoothing=0.3, on_change=None):
+        self.depth = depth
+        self.lag_thresholds = tuple(lag_thresholds)
+        self.depth_thresholds = tuple(depth_thresholds)
+        self.interval = interval
+        self.recover_after = recover_after
+        self.smoothing = smoothing
+        self.on_change = on_change
+        self.tier = TIER_NORMAL
+        self.lag = 0.0
+        self.queued = 0
+        self.calm_since = None
+        self.task = None
+
+    @property
+    def tier_name(self):
+        return TIER_NAMES[self.tier]
+
+    def at_least(self, tier):
+        return self.tier >= tier
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def due_tier(self):
+        """The tier the latest measurements call for"""
+        tier = TIER_NORMAL
+        for level, (lag_threshold, depth_threshold) in enumerate(zip(self.lag_thresholds, self.depth_thresholds), start=1):
+            if self.lag >= lag_threshold or self.queued >= depth_threshold:
+                tier = level
+        return tier
+
+    def observe(self, lag, queued, now):
+        """Fold in one sample and move between tiers if needed"""
+        self.lag += self.smoothing * (lag - self.lag)
+        self.queued = queued
+        due = self.due_tier()
+        if due > self.tier:
+            self._set_tier(due)
+            self.calm_since = None
+        elif due < self.tier:
+            if self.calm_since is None:
+                self.calm_since = now
+            elif now - self.calm_since >= self.recover_after:
+                self._set_tier(self.tier - 1)
+                # The next step down needs its own calm period
+                self.calm_since = now
+        else:
+            self.calm_since = None
+
+    def _set_tier(self, tier):
+        previous, self.tier = self.tier, tier
+        load_tier.set(tier)
+        tier_changes.inc('up' if tier > previous else 'down')
+        if self.on_change is not None:
+            self.on_change(previous, tier)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            loop_lag.observe(lag)
+            try:
+                queued = self.depth()
+            except Exception as e:
+                print(f"Failed to measure queue depth: {e}")
+                queued = 0
+            self.observe(lag, queued, time.monotonic())
@@ -1,47 +1,1090 @@
 
+import asyncio
 import discord
+from discord import app_commands
 from discord.ext import commands
+import io
+import json
+import math
 import os
+import re
+import signal
 import time
 from datetime import datetime, timedelta
 
+import metrics
+from afkstore import AFKRecord, AFKStore
+from bulkjob import BulkJob
+from eventlog import EventRecorder, capture_path
+from loadshed import LoadMonitor, TIER_PAUSE_PRESENCE, TIER_SLOW_STICKIES, TIER_SUSPEND_AFK
+from notifier import NotificationBatcher, PresenceDebouncer
+from outbound import PRIORITY_AFK, PRIORITY_COMMAND, PRIORITY_NOTIFY, PRIORITY_STICKY, OutboundQueue, Superseded
+from storage import WriteBehind, open_store
+from timerwheel import TimerWheel
+
+# Bot profile: 'full' runs every feature, 'sticky' keeps only stickies, AFK and commands
+# and drops the member/presence intents and caches that dominate memory on large guilds
+BOT_PROFILE = os.getenv('BOT_PROFILE', 'full')
+if BOT_PROFILE not in ('full', 'sticky'):
+    raise ValueError(f"Unknown BOT_PROFILE: {BOT_PROFILE!r}")
+STICKY_ONLY = BOT_PROFILE == 'sticky'
+
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
-intents.members = True
-intents.presences = True
+intents.members = not STICKY_ONLY
+intents.presences = not STICKY_ONLY
+
+if STICKY_ONLY:
+    bot_options = {
+        'member_cache_flags': discord.MemberCacheFlags.none(),
+        'chunk_guilds_at_startup': False,
+        # Stickies and AFK only need live message events, not the message cache
+        'max_messages': None,
+    }
+else:
+    bot_options = {}
+
+# Sharding: AUTO_SHARD=1 lets discord.py pick the shard count, while launcher.py
+# sets SHARD_COUNT and SHARD_IDS so each worker process runs its own shard range
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', 0)) or None
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv('SHARD_IDS', '').split(',') if shard_id] or None
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+if SHARD_COUNT or SHARD_IDS or os.getenv('AUTO_SHARD') == '1':
+    bot = commands.AutoShardedBot(command_prefix='!', intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS, **bot_options)
+else:
+    bot = commands.Bot(command_prefix='!', intents=intents, **bot_options)
 
 # Channel ID where notifications will be sent
 NOTIFY_CHANNEL_ID = 1335597135202353224
 
+# Outgoing sends and deletes share one queue ordered by priority:
+# command responses > sticky reposts > AFK notices > notify-channel logs.
+# Each channel gets a local bucket per route: route -> (requests, per seconds)
+OUTBOUND_ROUTE_LIMITS = {
+    'send': (5, 5.0),
+    'delete': (5, 1.0),
+    # Webhook-delivered stickies draw on the webhook's own buckets instead of the bot's
+    'webhook_send': (5, 2.0),
+    'webhook_delete': (5, 1.0),
+    'create_webhook': (1, 10.0),
+}
+outbound = OutboundQueue(OUTBOUND_ROUTE_LIMITS, concurrency=int(os.getenv('OUTBOUND_CONCURRENCY', 16)))
+
+def queue_send(priority, channel, *args, tag=None, **kwargs):
+    """Send a message through the outbound queue"""
+    return outbound.submit(priority, 'send', channel.id, lambda: channel.send(*args, **kwargs), tag=tag)
+
+def _log_send_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Failed to send message: {future.exception()}")
+
+def post_send(priority, channel, *args, **kwargs):
+    """Queue a send without waiting for the channel's rate limit, logging it if it fails"""
+    future = queue_send(priority, channel, *args, **kwargs)
+    future.add_done_callback(_log_send_failure)
+
+# Join/leave/presence notifications are batched into digest messages
+# The notify channel may live on a shard owned by another process, so fall back to a partial channel
+notifier = NotificationBatcher(
+    lambda: bot.get_channel(NOTIFY_CHANNEL_ID) or bot.get_partial_messageable(NOTIFY_CHANNEL_ID),
+    flush_interval=float(os.getenv('NOTIFY_FLUSH_INTERVAL', 2)),
+    max_queue=int(os.getenv('NOTIFY_MAX_QUEUE', 500)),
+    summarize_after=int(os.getenv('NOTIFY_SUMMARIZE_AFTER', 50)),
+    send=lambda channel, *args, **kwargs: queue_send(PRIORITY_NOTIFY, channel, *args, **kwargs)
+)
+
+# Embed descriptions are capped at 4096 characters
+EMBED_DESCRIPTION_LIMIT = 4096
+
+def push_presence_notice(member, online):
+    """Queue the online/offline notice for a member once their presence has settled"""
+    if online:
+        embed = discord.Embed(
+            title="Member Online",
+            description=f"{member.mention} ({member.display_name}) is now online",
+            color=discord.Color.green()
+        )
+    else:
+        embed = discord.Embed(
+            title="Member Offline",
+            description=f"{member.display_name} is now offline",
+            color=discord.Color.greyple()
+        )
+    embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
+    notifier.push(embed)
+
+# Presence changes arrive once per shared guild and often flap during reconnects: each user's
+# transitions are collapsed over PRESENCE_NOTICE_WINDOW seconds and repeats dropped for PRESENCE_DEDUP_TTL
+presence_notices = PresenceDebouncer(
+    push_presence_notice,
+    window=float(os.getenv('PRESENCE_NOTICE_WINDOW', 5)),
+    dedup_ttl=float(os.getenv('PRESENCE_DEDUP_TTL', 60))
+)
+
+def _env_floats(name, default):
+    return tuple(float(value) for value in os.getenv(name, default).split(','))
+
+def on_load_tier_change(previous, tier):
+    """Log every move between degraded tiers"""
+    print(f"Load tier {previous} -> {tier} ({load_monitor.tier_name}): "
+          f"loop lag {load_monitor.lag * 1000:.0f}ms, {load_monitor.queued} queued")
+
+# Under load the bot sheds work in tiers: 1 pauses presence notices, 2 also slows sticky
+# reposts, 3 also suspends AFK notices. Tier N is entered when the event-loop lag (seconds)
+# or the number of queued sends and notices reaches the Nth threshold, and left one tier at
+# a time once the load has stayed below it for LOAD_RECOVER_AFTER seconds.
+load_monitor = LoadMonitor(
+    lambda: len(outbound) + len(notifier.queue),
+    lag_thresholds=_env_floats('LOAD_LAG_THRESHOLDS', '0.1,0.25,0.5'),
+    depth_thresholds=_env_floats('LOAD_QUEUE_THRESHOLDS', '200,500,1000'),
+    interval=float(os.getenv('LOAD_SAMPLE_INTERVAL', 0.5)),
+    recover_after=float(os.getenv('LOAD_RECOVER_AFTER', 10)),
+    on_change=on_load_tier_change
+)
+
 # Bot start time for uptime tracking
 bot_start_time = None
 
-# AFK system storage
-afk_users = {}
+# AFK system storage: {user_id: AFKRecord}. With AFK_TTL set, statuses older than that many
+# seconds are cleared by one sweep every AFK_SWEEP_INTERVAL seconds
+AFK_TTL = int(os.getenv('AFK_TTL', 0))
+AFK_SWEEP_INTERVAL = float(os.getenv('AFK_SWEEP_INTERVAL', 60))
+afk_users = AFKStore(ttl=AFK_TTL)
+afk_sweep_task = None
+
+# AFK users per guild the status was set in, so messages in guilds without AFK users skip the mention check
+guild_afk_users = {}  # {guild_id: set(user_id)}
 
 # Sticky message system storage
-sticky_messages = {}  # {channel_id: {'message': str, 'active': bool, 'last_message_id': int}}
+sticky_messages = {}  # {channel_id: {'entries': [entry], 'message': str or None, 'active': bool, 'last_message_id': int, 'quiet_period': float, 'max_delay': float, 'repost_after_messages': int, 'repost_after_seconds': float, 'rotate_every': float, 'rotation_index': int, 'rotated_at': float}}
+# Each channel holds an ordered list of entries: {'id': int, 'message': str, 'starts_at': float or None, 'expires_at': float or None}
+# 'message' is the text of the entry currently shown, or None while every entry is still scheduled
+
+# How sticky embeds look, also used to recognise our own stickies in channel history
+STICKY_EMBED_TITLE = "📌 Sticky Message"
+STICKY_EMBED_FOOTER = "This message is pinned to this channel"
+
+# Startup sweep for stickies orphaned by a crash: how far back to look and how many channels at once
+RECONCILE_HISTORY_LIMIT = int(os.getenv('RECONCILE_HISTORY_LIMIT', 50))
+RECONCILE_CONCURRENCY = int(os.getenv('RECONCILE_CONCURRENCY', 8))
+
+# Secondary index of sticky channels per guild
+guild_stickies = {}  # {guild_id: set(channel_id)}
+
+# Optional Prometheus endpoint, served on 127.0.0.1:METRICS_PORT/metrics when set
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+metrics_server = None
+metrics.install_rate_limit_counter()
+
+# Optional capture of incoming gateway events to a compact log, for offline replay with replay.py.
+# Only IDs and event shapes are recorded, never message content. Every run writes a new log
+# named after EVENT_CAPTURE_PATH with its start time and PID, e.g. events-20240101-120000-1234.log.gz
+EVENT_CAPTURE_PATH = os.getenv('EVENT_CAPTURE_PATH')
+event_log = EventRecorder(capture_path(EVENT_CAPTURE_PATH)) if EVENT_CAPTURE_PATH else None
+if event_log:
+    print(f"Capturing gateway events to {event_log.path}")
+
+# Persistence: sticky and AFK state is written behind to this store and bulk-loaded on startup.
+# With STATE_STORE=kv several processes share one Redis-protocol server (STATE_STORE_PATH is its URL);
+# the dicts above stay the local cache and are refreshed from the invalidations other processes publish
+STATE_STORE_BACKEND = os.getenv('STATE_STORE', 'sqlite')
+STATE_STORE_PATH = os.getenv('STATE_STORE_PATH', 'redis://127.0.0.1:6379/0' if STATE_STORE_BACKEND == 'kv' else 'sticky.db')
+STATE_FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', 2))
+
+state_store = open_store(STATE_STORE_BACKEND, STATE_STORE_PATH)
+state_writer = WriteBehind(state_store, sticky_messages, afk_users, interval=STATE_FLUSH_INTERVAL)
+state_loaded = False
+state_listener = None
+reconcile_task = None
+
+# Sticky repost modes: (quiet_period, max_delay) in seconds.
+# A repost fires once the channel has been quiet for quiet_period seconds,
+# or max_delay seconds after the first message of a burst, whichever comes first.
+STICKY_REPOST_MODES = {
+    'instant': (0.0, 0.0),
+    'debounce': (float(os.getenv('STICKY_QUIET_PERIOD', 3)), float(os.getenv('STICKY_MAX_DELAY', 15))),
+}
+DEFAULT_STICKY_MODE = 'debounce'
+# While slowed under load, reposts wait for at least this quiet period and max delay
+STICKY_DEGRADED_WINDOW = (float(os.getenv('STICKY_DEGRADED_QUIET_PERIOD', 10)), float(os.getenv('STICKY_DEGRADED_MAX_DELAY', 60)))
+
+# Pending sticky reposts: {channel_id: {'first': float, 'last': float, 'task': asyncio.Task, 'in_flight': bool, 'followup': bool}}
+sticky_repost_state = {}
+
+# Messages seen since the last sticky post, for repost thresholds: {channel_id: {'messages': int, 'posted_at': float}}
+sticky_activity = {}
+
+# Member counters kept up to date from gateway events, so reads never scan the member cache:
+# {guild_id: {'total': int, 'online': int}}. Online means any status other than offline.
+member_counts = {}
+
+# Sticky delivery: 'bot' posts as the bot, 'webhook' posts through a webhook the bot creates in the channel.
+# Its credentials are stored on the sticky ('webhook_id', 'webhook_token') and the
+# Webhook objects built from them are cached here: {channel_id: discord.Webhook}
+STICKY_DELIVERY_MODES = ('bot', 'webhook')
+STICKY_WEBHOOK_NAME = "Sticky Messages"
+STICKY_WEBHOOK_KEYS = ('webhook_id', 'webhook_token', 'last_message_webhook_id')
+# Error codes meaning the webhook itself is gone: Unknown Webhook, Invalid Webhook Token
+WEBHOOK_GONE_CODES = (10015, 50027)
+sticky_webhooks = {}
+
+# Bulk sticky jobs, at most one running per guild: {guild_id: BulkJob}
+bulk_jobs = {}
+BULK_STICKY_CONCURRENCY = int(os.getenv('BULK_STICKY_CONCURRENCY', 4))
+STICKY_EXPORT_VERSION = 1
+
+# One shared timer wheel starts, expires and rotates every scheduled sticky (wall-clock times)
+sticky_timers = TimerWheel(lambda channel_id: refresh_sticky(channel_id), tick=1.0)
+
+# Serializes sticky posts per channel so two reposts never race on last_message_id
+sticky_locks = {}  # {channel_id: asyncio.Lock}
+
+def owns_guild(guild_id):
+    """Whether this process runs the shard a guild belongs to"""
+    if not bot.shard_count or bot.shard_ids is None:
+        return True
+    return (guild_id >> 22) % bot.shard_count in bot.shard_ids
+
+def set_sticky(channel_id, guild_id, sticky_data):
+    """Store a sticky for a channel and keep the guild index in sync"""
+    old_data = sticky_messages.get(channel_id)
+    if old_data and old_data.get('guild_id') != guild_id:
+        _unindex_sticky(channel_id, old_data)
+    sticky_data['guild_id'] = guild_id
+    sticky_messages[channel_id] = sticky_data
+    update_sticky_display(channel_id, sticky_data, post=False)
+    if sticky_data.get('message'):
+        get_sticky_embed(sticky_data)
+    if guild_id is not None:
+        guild_stickies.setdefault(guild_id, set()).add(channel_id)
+    state_writer.mark_sticky(channel_id)
+
+def remove_sticky(channel_id):
+    """Remove a channel's sticky from storage and the guild index"""
+    sticky_data = sticky_messages.pop(channel_id, None)
+    sticky_activity.pop(channel_id, None)
+    sticky_timers.cancel(channel_id)
+    if sticky_data:
+        _unindex_sticky(channel_id, sticky_data)
+    state_writer.mark_sticky(channel_id)
+    return sticky_data
+
+def on_state_invalidated(sticky_keys, afk_keys):
+    """Invalidation from another process: re-read the keys it changed"""
+    asyncio.create_task(refresh_shared_state(sticky_keys, afk_keys))
+
+async def refresh_shared_state(sticky_keys, afk_keys):
+    """Re-read changed stickies and AFK entries from the shared store into the local cache"""
+    if sticky_keys is None:
+        # Invalidations may have been missed, re-read everything
+        stickies, afk = await asyncio.to_thread(
+            lambda: (state_store.load_stickies(), state_store.load_afk())
+        )
+        # Keys changed locally but not flushed yet are newer than the store's copy
+        for channel_id in set(sticky_messages) - set(stickies) - state_writer.dirty_stickies:
+            stickies[channel_id] = None
+        for user_id in set(afk_users) - set(afk) - state_writer.dirty_afk:
+            afk[user_id] = None
+    else:
+        stickies, afk = await asyncio.to_thread(lambda: (
+            {channel_id: state_store.load_sticky(channel_id) for channel_id in sticky_keys},
+            {user_id: state_store.load_afk_user(user_id) for user_id in afk_keys}
+        ))
+    
+    for channel_id, sticky_data in stickies.items():
+        if channel_id in state_writer.dirty_stickies:
+            continue
+        if sticky_data is None:
+            if channel_id in sticky_messages:
+                cancel_sticky_repost(channel_id)
+                sticky_activity.pop(channel_id, None)
+                sticky_timers.cancel(channel_id)
+                _unindex_sticky(channel_id, sticky_messages.pop(channel_id))
+            continue
+        guild_id = sticky_data.get('guild_id')
+        if guild_id is None or not owns_guild(guild_id):
+            continue
+        _apply_shared_sticky(channel_id, sticky_data)
+    
+    loaded = {}
+    for user_id, afk_info in afk.items():
+        if user_id in state_writer.dirty_afk:
+            continue
+        old_info = afk_users.pop(user_id, None)
+        if old_info:
+            _unindex_afk(user_id, old_info)
+        if afk_info is not None:
+            loaded[user_id] = AFKRecord.from_row(afk_info)
+    # Inserted by age, so the expiry sweep can keep stopping at the first fresh record
+    afk_users.load(loaded)
+    for user_id, record in loaded.items():
+        _index_afk(user_id, record)
+
+def _apply_shared_sticky(channel_id, sticky_data):
+    old_data = sticky_messages.get(channel_id)
+    if old_data:
+        if old_data.get('guild_id') != sticky_data['guild_id']:
+            _unindex_sticky(channel_id, old_data)
+        # Keep the embed built for this text
+        if '_embed' in old_data:
+            sticky_data['_embed'] = old_data['_embed']
+    sticky_messages[channel_id] = sticky_data
+    guild_stickies.setdefault(sticky_data['guild_id'], set()).add(channel_id)
+    if not sticky_data['active']:
+        cancel_sticky_repost(channel_id)
+    if sticky_data.get('message'):
+        get_sticky_embed(sticky_data)
+    # The process that wrote it already posted it, only re-arm the schedule here
+    when = next_sticky_change(sticky_data, time.time())
+    if when is None:
+        sticky_timers.cancel(channel_id)
+    else:
+        sticky_timers.schedule(channel_id, when)
+
+def add_sticky_entry(sticky_data, message, starts_at=None, expires_at=None):
+    """Append a sticky to a channel's ordered set of stickies"""
+    entries = sticky_data.setdefault('entries', [])
+    entry = {
+        'id': max((entry['id'] for entry in entries), default=0) + 1,
+        'message': message,
+        'starts_at': starts_at,
+        'expires_at': expires_at
+    }
+    entries.append(entry)
+    return entry
+
+def _entry_live(entry, now):
+    return ((entry['starts_at'] is None or entry['starts_at'] <= now)
+            and (entry['expires_at'] is None or now < entry['expires_at']))
+
+def current_sticky_entry(sticky_data, now):
+    """The entry that should be shown right now, or None"""
+    live = [entry for entry in sticky_data['entries'] if _entry_live(entry, now)]
+    if not live:
+        return None
+    if sticky_data.get('rotate_every'):
+        return live[sticky_data.get('rotation_index', 0) % len(live)]
+    return live[0]
+
+def next_sticky_change(sticky_data, now):
+    """Wall-clock time the shown entry may change next, or None if it never will by itself"""
+    times = [
+        when for entry in sticky_data['entries']
+        for when in (entry['starts_at'], entry['expires_at'])
+        if when is not None and when > now
+    ]
+    if sticky_data.get('rotate_every') and len(sticky_data['entries']) > 1:
+        times.append(sticky_data.get('rotated_at', now) + sticky_data['rotate_every'])
+    return min(times, default=None)
+
+def update_sticky_display(channel_id, sticky_data, now=None, post=True):
+    """Work out which entry a channel shows, repost if it changed and arm the channel's timer"""
+    now = now or time.time()
+    entry = current_sticky_entry(sticky_data, now)
+    text = entry['message'] if entry else None
+    if text != sticky_data.get('message'):
+        sticky_data['message'] = text
+        state_writer.mark_sticky(channel_id)
+        if post and sticky_data['active']:
+            channel = bot.get_channel(channel_id)
+            if channel:
+                asyncio.create_task(_show_current_sticky(channel))
+    
+    when = next_sticky_change(sticky_data, now)
+    if when is None:
+        sticky_timers.cancel(channel_id)
+    else:
+        sticky_timers.schedule(channel_id, when)
+
+def refresh_sticky(channel_id):
+    """Timer callback: drop expired entries, advance rotation and update what the channel shows"""
+    sticky_data = sticky_messages.get(channel_id)
+    if sticky_data is None:
+        return
+    now = time.time()
+    
+    entries = [entry for entry in sticky_data['entries'] if entry['expires_at'] is None or entry['expires_at'] > now]
+    if len(entries) != len(sticky_data['entries']):
+        sticky_data['entries'] = entries
+        state_writer.mark_sticky(channel_id)
+    if not entries:
+        asyncio.create_task(_retire_sticky(channel_id))
+        return
+    
+    rotate_every = sticky_data.get('rotate_every')
+    if rotate_every and now >= sticky_data.get('rotated_at', 0) + rotate_every:
+        sticky_data['rotation_index'] = sticky_data.get('rotation_index', 0) + 1
+        sticky_data['rotated_at'] = now
+        state_writer.mark_sticky(channel_id)
+    
+    update_sticky_display(channel_id, sticky_data, now)
+
+async def _show_current_sticky(channel):
+    async with sticky_lock(channel.id):
+        sticky_data = sticky_messages.get(channel.id)
+        if not sticky_data or not sticky_data['active']:
+            return
+        if sticky_data.get('message'):
+            await repost_sticky(channel, sticky_data)
+        elif sticky_data.get('last_message_id'):
+            # Nothing is due to be shown right now
+            await clear_sticky_post(channel, sticky_data)
+
+async def _retire_sticky(channel_id):
+    """Remove a channel's sticky once every entry in it has expired"""
+    cancel_sticky_repost(channel_id)
+    async with sticky_lock(channel_id):
+        sticky_data = sticky_messages.get(channel_id)
+        if sticky_data is None or sticky_data['entries']:
+            return
+        channel = bot.get_channel(channel_id)
+        if channel:
+            await clear_sticky_post(channel, sticky_data)
+            await delete_sticky_webhook(channel, sticky_data)
+        remove_sticky(channel_id)
+    sticky_locks.pop(channel_id, None)
+
+def _unindex_sticky(channel_id, sticky_data):
+    channels = guild_stickies.get(sticky_data.get('guild_id'))
+    if channels:
+        channels.discard(channel_id)
+        if not channels:
+            del guild_stickies[sticky_data['guild_id']]
+
+class PrebuiltEmbed(discord.Embed):
+    """Embed that serializes itself once and reuses the payload on every send"""
+    
+    def freeze(self):
+        self._payload = super().to_dict()
+        return self
+    
+    def to_dict(self):
+        return self._payload
+
+def cache_profile():
+    """Sizes of the discord.py caches and our own state, for the startup report"""
+    return {
+        'guilds': len(bot.guilds),
+        'channels': sum(len(guild.channels) for guild in bot.guilds),
+        'members': sum(len(guild.members) for guild in bot.guilds),
+        'users': len(bot.users),
+        'messages': len(bot.cached_messages),
+        'stickies': len(sticky_messages),
+        'afk_users': len(afk_users),
+    }
+
+def seed_member_counts(guild):
+    """Count a guild's members from the cache, once per ready instead of on every read"""
+    online = sum(1 for member in guild.members if member.status != discord.Status.offline)
+    counts = member_counts[guild.id] = {'total': guild.member_count or len(guild.members), 'online': online}
+    return counts
+
+def get_member_counts(guild):
+    counts = member_counts.get(guild.id)
+    return counts if counts is not None else seed_member_counts(guild)
+
+def count_member_change(member, joined):
+    """Apply a join or leave to the guild's counters"""
+    counts = member_counts.get(member.guild.id)
+    if counts is None:
+        # The cache already reflects this event, so a fresh count includes it
+        seed_member_counts(member.guild)
+        return
+    step = 1 if joined else -1
+    counts['total'] = max(0, counts['total'] + step)
+    if member.status != discord.Status.offline:
+        counts['online'] = max(0, counts['online'] + step)
+
+def count_presence_change(before, after):
+    """Apply an online/offline transition to the guild's online counter"""
+    was_online = before.status != discord.Status.offline
+    if was_online == (after.status != discord.Status.offline):
+        return
+    counts = member_counts.get(after.guild.id)
+    if counts is None:
+        seed_member_counts(after.guild)
+        return
+    counts['online'] = max(0, counts['online'] + (-1 if was_online else 1))
+
+def capture_snapshot():
+    """Record the stickies and AFK users the captured traffic will run against"""
+    stickies = [
+        {'channel_id': channel_id, 'guild_id': sticky_data.get('guild_id'), 'entries': len(sticky_data['entries']),
+         **{key: sticky_data.get(key, STICKY_EXPORT_SETTINGS[key])
+            for key in ('active', 'quiet_period', 'max_delay', 'repost_after_messages', 'repost_after_seconds', 'delivery')}}
+        for channel_id, sticky_data in sticky_messages.items()
+    ]
+    afk = [[user_id, afk_info.guild_id] for user_id, afk_info in afk_users.items()]
+    event_log.snapshot(stickies, afk)
+
+def set_afk(user_id, reason, guild_id):
+    """Mark a user as AFK from now and keep the guild index in sync"""
+    # Re-inserting moves the user to the back of the expiry order
+    clear_afk(user_id)
+    afk_info = afk_users[user_id] = AFKRecord(reason, time.time(), guild_id)
+    _index_afk(user_id, afk_info)
+    state_writer.mark_afk(user_id)
+    return afk_info
+
+def clear_afk(user_id):
+    """Remove a user's AFK status, returning it if they had one"""
+    afk_info = afk_users.pop(user_id, None)
+    if afk_info:
+        _unindex_afk(user_id, afk_info)
+        state_writer.mark_afk(user_id)
+    return afk_info
+
+def _index_afk(user_id, afk_info):
+    if afk_info.guild_id is not None:
+        guild_afk_users.setdefault(afk_info.guild_id, set()).add(user_id)
+
+def _unindex_afk(user_id, afk_info):
+    users = guild_afk_users.get(afk_info.guild_id)
+    if users:
+        users.discard(user_id)
+        if not users:
+            del guild_afk_users[afk_info.guild_id]
+
+async def sweep_expired_afk():
+    """Clear AFK statuses older than AFK_TTL, in one pass every AFK_SWEEP_INTERVAL seconds"""
+    while True:
+        await asyncio.sleep(AFK_SWEEP_INTERVAL)
+        expired = afk_users.expired()
+        for user_id in expired:
+            clear_afk(user_id)
+        if expired:
+            print(f"Cleared {len(expired)} expired AFK status(es)")
+
+def build_afk_notice(afk_mentions):
+    """Build one embed covering every AFK user mentioned in a message"""
+    if len(afk_mentions) == 1:
+        member, afk_info = afk_mentions[0]
+        return discord.Embed(
+            title="User is AFK",
+            description=f"{member.display_name} is currently AFK: {afk_info.reason}",
+            color=discord.Color.orange(),
+            timestamp=afk_info.time
+        )
+    
+    lines = []
+    for member, afk_info in afk_mentions:
+        since = discord.utils.format_dt(afk_info.time, 'R')
+        lines.append(f"**{member.display_name}** is currently AFK: {afk_info.reason} ({since})")
+    description = "\n".join(lines)
+    if len(description) > EMBED_DESCRIPTION_LIMIT:
+        description = description[:EMBED_DESCRIPTION_LIMIT - 3] + "..."
+    return discord.Embed(
+        title="Users are AFK",
+        description=description,
+        color=discord.Color.orange()
+    )
+
+def build_sticky_embed(message):
+    """Build the embed used for sticky messages"""
+    sticky_embed = PrebuiltEmbed(
+        title=STICKY_EMBED_TITLE,
+        description=message,
+        color=discord.Color.gold()
+    )
+    sticky_embed.set_footer(text=STICKY_EMBED_FOOTER)
+    return sticky_embed.freeze()
+
+def get_sticky_embed(sticky_data):
+    """Return the cached sticky embed, building it only when the sticky text changed"""
+    embed = sticky_data.get('_embed')
+    if embed is None or embed.description != sticky_data['message']:
+        embed = build_sticky_embed(sticky_data['message'])
+        sticky_data['_embed'] = embed
+    return embed
+
+def cached_sticky_webhook(channel_id, sticky_data):
+    """The channel's sticky webhook built from its stored credentials, without any API call"""
+    webhook_id, token = sticky_data.get('webhook_id'), sticky_data.get('webhook_token')
+    if not webhook_id or not token:
+        return None
+    webhook = sticky_webhooks.get(channel_id)
+    if webhook is None or webhook.id != webhook_id:
+        webhook = sticky_webhooks[channel_id] = discord.Webhook.partial(webhook_id, token, client=bot)
+    return webhook
+
+def forget_sticky_webhook(channel_id, sticky_data):
+    """Drop credentials for a webhook that was deleted or whose token no longer works"""
+    sticky_webhooks.pop(channel_id, None)
+    if sticky_data.get('webhook_id'):
+        sticky_data['webhook_id'] = sticky_data['webhook_token'] = None
+        state_writer.mark_sticky(channel_id)
+
+async def provision_sticky_webhook(channel, sticky_data, priority=PRIORITY_STICKY):
+    """Return the channel's sticky webhook, creating it if needed.
+
+    If the webhook cannot be created the sticky falls back to bot delivery.
+    """
+    webhook = cached_sticky_webhook(channel.id, sticky_data)
+    if webhook is not None:
+        return webhook
+    try:
+        webhook = await outbound.submit(priority, 'create_webhook', channel.id, lambda: channel.create_webhook(
+            name=STICKY_WEBHOOK_NAME, reason="Delivers this channel's sticky message"
+        ))
+    except discord.HTTPException as e:
+        metrics.record_http_error(channel.guild.id, e)
+        print(f"Could not create a sticky webhook in channel {channel.id}, posting as the bot instead: {e}")
+        sticky_data['delivery'] = 'bot'
+        state_writer.mark_sticky(channel.id)
+        return None
+    sticky_data['webhook_id'], sticky_data['webhook_token'] = webhook.id, webhook.token
+    sticky_webhooks[channel.id] = webhook
+    state_writer.mark_sticky(channel.id)
+    return webhook
+
+async def delete_sticky_webhook(channel, sticky_data):
+    """Delete the channel's sticky webhook when its sticky is removed"""
+    webhook = cached_sticky_webhook(channel.id, sticky_data)
+    if webhook is None:
+        return
+    forget_sticky_webhook(channel.id, sticky_data)
+    try:
+        await webhook.delete(reason="Sticky message removed")
+    except discord.HTTPException as e:
+        metrics.record_http_error(channel.guild.id, e)
+
+def sticky_post_webhook(channel_id, sticky_data):
+    """The webhook that posted the channel's current sticky message, or None if the bot posted it"""
+    webhook_id = sticky_data.get('last_message_webhook_id')
+    if webhook_id is None or webhook_id != sticky_data.get('webhook_id'):
+        return None
+    return cached_sticky_webhook(channel_id, sticky_data)
+
+async def clear_sticky_post(channel, sticky_data, priority=PRIORITY_STICKY):
+    """Delete the channel's current sticky message, if any, and forget its ID"""
+    if not sticky_data.get('last_message_id'):
+        return
+    await delete_sticky_message(channel, sticky_data['last_message_id'], priority=priority,
+                                webhook=sticky_post_webhook(channel.id, sticky_data))
+    sticky_data['last_message_id'] = None
+    state_writer.mark_sticky(channel.id)
+
+async def delete_sticky_message(channel, message_id, retry=True, priority=PRIORITY_STICKY, tag=None, webhook=None):
+    """Delete a sticky message by ID without fetching it first, through the webhook that posted it if given"""
+    guild_id = channel.guild.id
+    try:
+        if webhook is not None:
+            await outbound.submit(priority, 'webhook_delete', channel.id, lambda: webhook.delete_message(message_id), tag=tag)
+        else:
+            await outbound.submit(priority, 'delete', channel.id,
+                                  lambda: channel.get_partial_message(message_id).delete(), tag=tag)
+    except discord.HTTPException as e:
+        if webhook is not None and e.code in WEBHOOK_GONE_CODES:
+            # The webhook is gone but its message may not be, delete it as the bot
+            sticky_data = sticky_messages.get(channel.id)
+            if sticky_data is not None:
+                forget_sticky_webhook(channel.id, sticky_data)
+            return await delete_sticky_message(channel, message_id, retry=retry, priority=priority, tag=tag)
+        if isinstance(e, discord.NotFound):
+            # Already gone
+            metrics.sticky_deletes.inc(str(guild_id), 'not_found')
+        elif isinstance(e, discord.Forbidden):
+            metrics.sticky_deletes.inc(str(guild_id), 'forbidden')
+            metrics.record_http_error(guild_id, e)
+        else:
+            metrics.sticky_deletes.inc(str(guild_id), 'error')
+            metrics.record_http_error(guild_id, e)
+            if not retry:
+                return False
+            # Transient failure, try once more before giving up
+            return await delete_sticky_message(channel, message_id, retry=False, priority=priority, webhook=webhook)
+    else:
+        metrics.sticky_deletes.inc(str(guild_id), 'ok')
+    return True
+
+async def _send_sticky_webhook(channel, sticky_data, embed, priority, tag):
+    """Post through the channel's webhook, recreating it once if it was deleted; None if it cannot be used"""
+    for attempt in range(2):
+        webhook = await provision_sticky_webhook(channel, sticky_data, priority)
+        if webhook is None:
+            return None
+        try:
+            return await outbound.submit(priority, 'webhook_send', channel.id, lambda: webhook.send(
+                embed=embed, username=bot.user.display_name, avatar_url=bot.user.display_avatar.url, wait=True
+            ), tag=tag)
+        except discord.HTTPException as e:
+            if e.code not in WEBHOOK_GONE_CODES or attempt:
+                raise
+            forget_sticky_webhook(channel.id, sticky_data)
+
+async def _send_sticky(channel, sticky_data, embed, priority, tag):
+    try:
+        new_sticky = None
+        if sticky_data.get('delivery') == 'webhook':
+            new_sticky = await _send_sticky_webhook(channel, sticky_data, embed, priority, tag)
+        if new_sticky is None:
+            new_sticky = await queue_send(priority, channel, embed=embed, tag=tag)
+    except discord.HTTPException as e:
+        metrics.record_http_error(channel.guild.id, e)
+        raise
+    metrics.sticky_reposts.inc(str(channel.guild.id))
+    return new_sticky
+
+@metrics.timed('repost_sticky')
+async def repost_sticky(channel, sticky_data, priority=PRIORITY_STICKY):
+    """Delete the previous sticky message in a channel and post a fresh one"""
+    old_message_id = sticky_data.get('last_message_id')
+    old_webhook = sticky_post_webhook(channel.id, sticky_data)
+    embed = get_sticky_embed(sticky_data)
+    
+    # A repost still waiting in the outbound queue is out of date now
+    tag = ('sticky', channel.id)
+    outbound.supersede(tag)
+    sticky_activity[channel.id] = {'messages': 0, 'posted_at': time.monotonic()}
+    
+    if not old_message_id:
+        try:
+            new_sticky = await _send_sticky(channel, sticky_data, embed, priority, tag)
+            sticky_data['last_message_id'] = new_sticky.id
+            sticky_data['last_message_webhook_id'] = getattr(new_sticky, 'webhook_id', None)
+            state_writer.mark_sticky(channel.id)
+        except (discord.HTTPException, Superseded):
+            pass
+        return
+    
+    # Delete the previous sticky and post the new one concurrently
+    deleted, new_sticky = await asyncio.gather(
+        delete_sticky_message(channel, old_message_id, retry=False, priority=priority, tag=tag, webhook=old_webhook),
+        _send_sticky(channel, sticky_data, embed, priority, tag),
+        return_exceptions=True
+    )
+    
+    if isinstance(new_sticky, Superseded):
+        # A newer repost took over and will clean up the previous sticky itself
+        return
+    
+    if isinstance(new_sticky, BaseException):
+        # Nothing was posted; clear the ID so the next message posts a fresh sticky
+        sticky_data['last_message_id'] = None
+        state_writer.mark_sticky(channel.id)
+        if deleted is not True:
+            await delete_sticky_message(channel, old_message_id, priority=priority, webhook=old_webhook)
+        return
+    
+    sticky_data['last_message_id'] = new_sticky.id
+    sticky_data['last_message_webhook_id'] = getattr(new_sticky, 'webhook_id', None)
+    state_writer.mark_sticky(channel.id)
+    if deleted is not True:
+        # Fall back to a serial retry now that the new sticky is in place
+        await delete_sticky_message(channel, old_message_id, priority=priority, webhook=old_webhook)
+
+def is_sticky_post(message, webhook_id=None):
+    """Whether a message is one of our own sticky embeds, posted by the bot or the channel's sticky webhook"""
+    if not message.embeds:
+        return False
+    if message.author.id != bot.user.id and (webhook_id is None or message.webhook_id != webhook_id):
+        return False
+    embed = message.embeds[0]
+    return embed.title == STICKY_EMBED_TITLE and embed.footer.text == STICKY_EMBED_FOOTER
+
+async def reconcile_sticky_channel(channel, sticky_data):
+    """Delete stale copies of a channel's sticky and re-link the newest one"""
+    try:
+        posts = [message async for message in channel.history(limit=RECONCILE_HISTORY_LIMIT) if is_sticky_post(message, sticky_data.get('webhook_id'))]
+    except discord.HTTPException as e:
+        metrics.record_http_error(channel.guild.id, e)
+        return 0
+    
+    # History is newest first; keep the newest copy if it still shows the current text
+    keep = None
+    if posts and posts[0].embeds[0].description == sticky_data['message']:
+        keep = posts[0]
+    stale = [message for message in posts if message is not keep]
+    
+    if keep and keep.id != sticky_data.get('last_message_id'):
+        sticky_data['last_message_id'] = keep.id
+        sticky_data['last_message_webhook_id'] = keep.webhook_id
+        state_writer.mark_sticky(channel.id)
+    elif not keep and sticky_data.get('last_message_id') in {message.id for message in stale}:
+        sticky_data['last_message_id'] = None
+        state_writer.mark_sticky(channel.id)
+    
+    # Bulk delete only works on messages younger than 14 days
+    cutoff = discord.utils.utcnow() - timedelta(days=14) + timedelta(minutes=5)
+    recent = [message for message in stale if message.created_at > cutoff]
+    old = [message for message in stale if message.created_at <= cutoff]
+    if len(recent) == 1:
+        old.extend(recent)
+    elif recent:
+        try:
+            await outbound.submit(PRIORITY_STICKY, 'delete', channel.id, lambda: channel.delete_messages(recent))
+        except discord.HTTPException as e:
+            metrics.record_http_error(channel.guild.id, e)
+            old.extend(recent)
+    for message in old:
+        await delete_sticky_message(channel, message.id)
+    
+    metrics.sticky_orphans.inc(amount=len(stale))
+    return len(stale)
+
+async def reconcile_stickies():
+    """Startup sweep removing stickies orphaned when last_message_id was lost"""
+    started = time.perf_counter()
+    channel_ids = iter(list(sticky_messages))
+    totals = {'channels': 0, 'removed': 0, 'failed': 0}
+    
+    # A fixed pool of workers keeps the sweep bounded no matter how many channels there are
+    async def worker():
+        for channel_id in channel_ids:
+            channel = bot.get_channel(channel_id)
+            sticky_data = sticky_messages.get(channel_id)
+            if channel is None or sticky_data is None:
+                continue
+            totals['channels'] += 1
+            try:
+                async with sticky_lock(channel_id):
+                    totals['removed'] += await reconcile_sticky_channel(channel, sticky_data)
+            except Exception as e:
+                totals['failed'] += 1
+                print(f"Failed to reconcile stickies in channel {channel_id}: {e}")
+    
+    await asyncio.gather(*(worker() for _ in range(RECONCILE_CONCURRENCY)))
+    print(f"Reconciled {totals['channels']} sticky channel(s) in {time.perf_counter() - started:.2f}s: "
+          f"removed {totals['removed']} orphaned sticky message(s), {totals['failed']} channel(s) failed")
+
+def sticky_lock(channel_id):
+    """Per-channel lock held while a sticky is being posted, replaced or removed"""
+    lock = sticky_locks.get(channel_id)
+    if lock is None:
+        lock = sticky_locks[channel_id] = asyncio.Lock()
+    return lock
+
+def note_sticky_activity(channel, sticky_data):
+    """Count a message towards the sticky's repost threshold and schedule a repost if one may be due"""
+    activity = sticky_activity.get(channel.id)
+    if activity is None:
+        activity = sticky_activity[channel.id] = {'messages': 0, 'posted_at': time.monotonic()}
+    activity['messages'] += 1
+    
+    after_messages = sticky_data.get('repost_after_messages', 1)
+    if activity['messages'] >= after_messages:
+        # Wake a worker that was waiting on the time threshold
+        schedule_sticky_repost(channel, wake=activity['messages'] == after_messages)
+    elif sticky_data.get('repost_after_seconds'):
+        schedule_sticky_repost(channel)
+
+def _sticky_repost_deadline(channel_id, sticky_data, state):
+    """When the pending repost may fire, or None if it has to wait for more messages"""
+    quiet_period, max_delay = sticky_data.get('quiet_period', 0.0), sticky_data.get('max_delay', 0.0)
+    if load_monitor.at_least(TIER_SLOW_STICKIES):
+        quiet_period = max(quiet_period, STICKY_DEGRADED_WINDOW[0])
+        max_delay = max(max_delay, STICKY_DEGRADED_WINDOW[1])
+    deadline = min(state['last'] + quiet_period, state['first'] + max_delay)
+    activity = sticky_activity.get(channel_id)
+    if activity is None or activity['messages'] >= sticky_data.get('repost_after_messages', 1):
+        return deadline
+    if sticky_data.get('repost_after_seconds') and activity['messages']:
+        return max(deadline, activity['posted_at'] + sticky_data['repost_after_seconds'])
+    return None
+
+def schedule_sticky_repost(channel, wake=False):
+    """Coalesce a burst of messages in a channel into a single sticky repost"""
+    now = time.monotonic()
+    state = sticky_repost_state.get(channel.id)
+    if state is None:
+        state = {'first': now, 'last': now, 'task': None, 'in_flight': False, 'followup': False, 'wake': asyncio.Event()}
+        sticky_repost_state[channel.id] = state
+        state['task'] = asyncio.create_task(_sticky_repost_worker(channel, state))
+    elif state['in_flight']:
+        # Only one repost per channel at a time; remember that another one is due afterwards
+        if not state['followup']:
+            state['followup'] = True
+            state['first'] = now
+        state['last'] = now
+    else:
+        state['last'] = now
+        if wake:
+            state['wake'].set()
+
+def cancel_sticky_repost(channel_id):
+    """Drop any pending sticky repost for a channel"""
+    state = sticky_repost_state.pop(channel_id, None)
+    if state is None:
+        return
+    state['followup'] = False
+    # A repost already in flight is left to finish under the channel lock
+    if state['task'] and not state['in_flight']:
+        state['task'].cancel()
+
+async def _sticky_repost_worker(channel, state):
+    try:
+        while True:
+            while True:
+                sticky_data = sticky_messages.get(channel.id)
+                if not sticky_data or not sticky_data['active'] or not sticky_data.get('message'):
+                    return
+                deadline = _sticky_repost_deadline(channel.id, sticky_data, state)
+                if deadline is None:
+                    return
+                delay = deadline - time.monotonic()
+                if delay <= 0:
+                    break
+                state['wake'].clear()
+                try:
+                    await asyncio.wait_for(state['wake'].wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            
+            state['in_flight'] = True
+            async with sticky_lock(channel.id):
+                # The sticky may have been replaced or stopped while we waited for the lock
+                sticky_data = sticky_messages.get(channel.id)
+                if sticky_data and sticky_data['active'] and sticky_data.get('message') and sticky_repost_state.get(channel.id) is state:
+                    await repost_sticky(channel, sticky_data)
+            state['in_flight'] = False
+            
+            # Messages that arrived during the repost open the next window
+            if not state['followup'] or sticky_repost_state.get(channel.id) is not state:
+                return
+            state['followup'] = False
+    finally:
+        if sticky_repost_state.get(channel.id) is state:
+            del sticky_repost_state[channel.id]
+
+def stop_sticky(channel_id):
+    """Stop reposting a channel's sticky, leaving the last post in place"""
+    sticky_messages[channel_id]['active'] = False
+    state_writer.mark_sticky(channel_id)
+    cancel_sticky_repost(channel_id)
+
+async def start_sticky(channel, priority=PRIORITY_STICKY):
+    """Reactivate a stopped sticky and repost it"""
+    async with sticky_lock(channel.id):
+        sticky_data = sticky_messages[channel.id]
+        sticky_data['active'] = True
+        state_writer.mark_sticky(channel.id)
+        
+        # Post the sticky message, replacing the one left behind when it was stopped
+        if sticky_data.get('message'):
+            await repost_sticky(channel, sticky_data, priority=priority)
+
+async def delete_sticky(channel, priority=PRIORITY_STICKY):
+    """Delete a channel's sticky post and forget the sticky"""
+    cancel_sticky_repost(channel.id)
+    async with sticky_lock(channel.id):
+        # Delete the sticky message and its webhook if they exist
+        sticky_data = sticky_messages.get(channel.id)
+        if sticky_data:
+            await clear_sticky_post(channel, sticky_data, priority=priority)
+            await delete_sticky_webhook(channel, sticky_data)
+        
+        # Remove from storage
+        remove_sticky(channel.id)
+    sticky_locks.pop(channel.id, None)
+
+async def replace_sticky(channel, sticky_data, priority=PRIORITY_STICKY):
+    """Replace a channel's sticky config and post what it shows now; False if that post failed"""
+    cancel_sticky_repost(channel.id)
+    async with sticky_lock(channel.id):
+        old_data = sticky_messages.get(channel.id) or {}
+        sticky_data['last_message_id'] = old_data.get('last_message_id')
+        sticky_data['message'] = old_data.get('message')
+        # Keep using the channel's webhook rather than creating another one
+        for key in STICKY_WEBHOOK_KEYS:
+            if key in old_data:
+                sticky_data[key] = old_data[key]
+        set_sticky(channel.id, channel.guild.id, sticky_data)
+        if sticky_data['active'] and sticky_data['message']:
+            await repost_sticky(channel, sticky_data, priority=priority)
+            return bool(sticky_data['last_message_id'])
+        if sticky_data['last_message_id']:
+            # Stopped, or only scheduled for later
+            await clear_sticky_post(channel, sticky_data, priority=priority)
+    return True
 
 @bot.event
 async def on_ready():
-    global bot_start_time
+    global bot_start_time, state_loaded, state_listener, metrics_server, reconcile_task, afk_sweep_task
     bot_start_time = datetime.utcnow()
     print(f'{bot.user} has connected to Discord!')
     
-    # Sync slash commands
-    try:
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} command(s)")
-    except Exception as e:
-        print(f"Failed to sync commands: {e}")
+    if METRICS_PORT and metrics_server is None:
+        metrics_server = await metrics.start_http_server(METRICS_PORT)
+        print(f"Serving metrics on http://127.0.0.1:{METRICS_PORT}/metrics")
+    
+    # Restore persisted state once; on_ready also fires after reconnects
+    if not state_loaded:
+        started = time.perf_counter()
+        stickies, afk = await asyncio.to_thread(
+            lambda: (state_store.load_stickies(), state_store.load_afk())
+        )
+        for channel_id, sticky_data in stickies.items():
+            if channel_id in sticky_messages:
+                continue
+            guild_id = sticky_data.get('guild_id')
+            if guild_id is None:
+                # Rows saved before the guild index existed
+                channel = bot.get_channel(channel_id)
+                guild_id = channel.guild.id if channel else None
+            # Stickies in guilds run by another process are left to that process
+            if guild_id is None or not owns_guild(guild_id):
+                continue
+            if 'entries' not in sticky_data:
+                # Rows saved when a channel could only hold one sticky
+                sticky_data['entries'] = []
+                add_sticky_entry(sticky_data, sticky_data['message'])
+            sticky_data['guild_id'] = guild_id
+            sticky_messages[channel_id] = sticky_data
+            guild_stickies.setdefault(guild_id, set()).add(channel_id)
+            # Catch up on entries that started, expired or rotated while we were offline
+            refresh_sticky(channel_id)
+        # AFK users are kept by every worker, so talking in any guild clears the status
+        afk_users.load({
+            user_id: AFKRecord.from_row(afk_info) for user_id, afk_info in afk.items() if user_id not in afk_users
+        })
+        for user_id in afk:
+            if user_id in afk_users:
+                _index_afk(user_id, afk_users[user_id])
+        state_loaded = True
+        state_writer.start()
+        state_listener = asyncio.create_task(state_store.listen(on_state_invalidated))
+        if AFK_TTL:
+            afk_sweep_task = asyncio.create_task(sweep_expired_afk())
+        load_monitor.start()
+        if event_log:
+            capture_snapshot()
+        # Runs in the background so a large sweep never holds up on_ready
+        reconcile_task = asyncio.create_task(reconcile_stickies())
+        print(f"Restored {len(sticky_messages)} sticky message(s) and {len(afk_users)} AFK user(s) in {time.perf_counter() - started:.2f}s")
+    
+    # A fresh session may have missed joins, leaves and presence changes, so count again
+    if not STICKY_ONLY:
+        for guild in bot.guilds:
+            seed_member_counts(guild)
+            await asyncio.sleep(0)
+    
+    profile = cache_profile()
+    print(f"Profile '{BOT_PROFILE}': " + ", ".join(f"{count} {name}" for name, count in profile.items()))
+    
+    # Sync slash commands, once per deployment rather than once per worker process
+    if bot.shard_ids is None or 0 in bot.shard_ids:
+        try:
+            synced = await bot.tree.sync()
+            print(f"Synced {len(synced)} command(s)")
+        except Exception as e:
+            print(f"Failed to sync commands: {e}")
     
     channel = bot.get_channel(NOTIFY_CHANNEL_ID)
     if channel:
         await channel.send("Bot is now online and monitoring!")
 
+@bot.event
+async def on_guild_available(guild):
+    """Triggered when a guild comes back after an outage"""
+    if not STICKY_ONLY and bot.is_ready():
+        seed_member_counts(guild)
+
+@bot.event
+async def on_guild_remove(guild):
+    """Triggered when the bot leaves or is removed from a server"""
+    member_counts.pop(guild.id, None)
+
 @bot.event
 async def on_guild_join(guild):
     """Triggered when the bot joins a new server"""
@@ -78,7 +1121,10 @@ async def on_guild_join(guild):
     print(f"Joined server: {guild.name} (ID: {guild.id}) with {guild.member_count} members")
 
 @bot.event
+@metrics.timed('on_message')
 async def on_message(message):
+    if event_log:
+        event_log.message(message)
     # Handle AFK system
     if message.author.bot and message.author != bot.user:
         return
@@ -86,35 +1132,18 @@ async def on_message(message):
     # Handle sticky message reposting
     if not message.author.bot and message.channel.id in sticky_messages:
         sticky_data = sticky_messages[message.channel.id]
-        if sticky_data['active']:
-            try:
-                # Delete the previous sticky message if it exists
-                if sticky_data.get('last_message_id'):
-                    try:
-                        old_message = await message.channel.fetch_message(sticky_data['last_message_id'])
-                        await old_message.delete()
-                    except:
-                        pass
-                
-                # Post the new sticky message
-                sticky_embed = discord.Embed(
-                    title="📌 Sticky Message",
-                    description=sticky_data['message'],
-                    color=discord.Color.gold()
-                )
-                sticky_embed.set_footer(text="This message is pinned to this channel")
-                
-                new_sticky = await message.channel.send(embed=sticky_embed)
-                sticky_data['last_message_id'] = new_sticky.id
-                
-            except discord.Forbidden:
-                pass
+        # Our own webhook's sticky posts are not channel activity
+        if sticky_data['active'] and sticky_data['message'] and (message.webhook_id is None or message.webhook_id != sticky_data.get('webhook_id')):
+            note_sticky_activity(message.channel, sticky_data)
     
     # Check if user is coming back from AFK
+    afk_info = None
     if not message.author.bot and message.author.id in afk_users:
-        afk_info = afk_users.pop(message.author.id)
-        afk_time = datetime.utcnow() - afk_info['time']
-        hours, remainder = divmod(int(afk_time.total_seconds()), 3600)
+        afk_info = clear_afk(message.author.id)
+    
+    # The status is cleared either way; only the notice is shed under load
+    if afk_info is not None and not load_monitor.at_least(TIER_SUSPEND_AFK):
+        hours, remainder = divmod(max(0, int(time.time()) - afk_info.since), 3600)
         minutes, seconds = divmod(remainder, 60)
         
         time_str = ""
@@ -129,85 +1158,84 @@ async def on_message(message):
             description=f"{message.author.mention} is no longer AFK\nYou were away for: {time_str}",
             color=discord.Color.green()
         )
-        await message.channel.send(embed=embed, delete_after=10)
+        post_send(PRIORITY_AFK, message.channel, embed=embed, delete_after=10)
     
-    # Check if someone mentioned an AFK user
-    if not message.author.bot:
+    # Check if someone mentioned an AFK user, answering all of them in one reply
+    guild_afk = guild_afk_users.get(message.guild.id) if message.guild else None
+    if guild_afk and message.mentions and not message.author.bot and not load_monitor.at_least(TIER_SUSPEND_AFK):
+        afk_mentions = []
+        seen = set()
         for mention in message.mentions:
-            if mention.id in afk_users and mention.id != message.author.id:
-                afk_info = afk_users[mention.id]
-                embed = discord.Embed(
-                    title="User is AFK",
-                    description=f"{mention.display_name} is currently AFK: {afk_info['reason']}",
-                    color=discord.Color.orange(),
-                    timestamp=afk_info['time']
-                )
-                await message.channel.send(embed=embed, delete_after=15)
+            if mention.id in guild_afk and mention.id != message.author.id and mention.id not in seen:
+                seen.add(mention.id)
+                afk_mentions.append((mention, afk_users[mention.id]))
+        if afk_mentions:
+            post_send(PRIORITY_AFK, message.channel, embed=build_afk_notice(afk_mentions), delete_after=15)
     
     await bot.process_commands(message)
 
 @bot.event
+@metrics.timed('on_member_join')
 async def on_member_join(member):
     """Triggered when a member joins the server"""
-    channel = bot.get_channel(NOTIFY_CHANNEL_ID)
-    if channel:
-        embed = discord.Embed(
-            title="🟢 Member Joined",
-            description=f"{member.mention} ({member.display_name}) joined the server",
-            color=discord.Color.green(),
-            timestamp=discord.utils.utcnow()
-        )
-        embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
-        embed.add_field(name="Account Created", value=member.created_at.strftime("%Y-%m-%d %H:%M:%S"), inline=True)
-        embed.add_field(name="Member ID", value=member.id, inline=True)
-        embed.add_field(name="Total Members", value=len(member.guild.members), inline=True)
-        embed.set_footer(text=f"Join #{len(member.guild.members)}")
-        await channel.send(embed=embed)
+    if event_log:
+        event_log.member(member, joined=True)
+    count_member_change(member, joined=True)
+    # The notifier resolves the notify channel, even when another worker's shard owns it
+    embed = discord.Embed(
+        title="🟢 Member Joined",
+        description=f"{member.mention} ({member.display_name}) joined the server",
+        color=discord.Color.green(),
+        timestamp=discord.utils.utcnow()
+    )
+    embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
+    embed.add_field(name="Account Created", value=member.created_at.strftime("%Y-%m-%d %H:%M:%S"), inline=True)
+    embed.add_field(name="Member ID", value=member.id, inline=True)
+    total = member_counts[member.guild.id]['total']
+    embed.add_field(name="Total Members", value=total, inline=True)
+    embed.set_footer(text=f"Join #{total}")
+    notifier.push(embed)
 
 @bot.event
+@metrics.timed('on_member_remove')
 async def on_member_remove(member):
     """Triggered when a member leaves the server"""
-    channel = bot.get_channel(NOTIFY_CHANNEL_ID)
-    if channel:
-        embed = discord.Embed(
-            title="🔴 Member Left",
-            description=f"{member.display_name} left the server",
-            color=discord.Color.red(),
-            timestamp=discord.utils.utcnow()
-        )
-        embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
-        embed.add_field(name="Member ID", value=member.id, inline=True)
-        embed.add_field(name="Joined Server", value=member.joined_at.strftime("%Y-%m-%d %H:%M:%S") if member.joined_at else "Unknown", inline=True)
-        embed.add_field(name="Total Members", value=len(member.guild.members), inline=True)
-        embed.set_footer(text=f"Member #{len(member.guild.members) + 1} left")
-        await channel.send(embed=embed)
+    if event_log:
+        event_log.member(member, joined=False)
+    count_member_change(member, joined=False)
+    embed = discord.Embed(
+        title="🔴 Member Left",
+        description=f"{member.display_name} left the server",
+        color=discord.Color.red(),
+        timestamp=discord.utils.utcnow()
+    )
+    embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
+    embed.add_field(name="Member ID", value=member.id, inline=True)
+    embed.add_field(name="Joined Server", value=member.joined_at.strftime("%Y-%m-%d %H:%M:%S") if member.joined_at else "Unknown", inline=True)
+    total = member_counts[member.guild.id]['total']
+    embed.add_field(name="Total Members", value=total, inline=True)
+    embed.set_footer(text=f"Member #{total + 1} left")
+    notifier.push(embed)
 
 @bot.event
+@metrics.timed('on_presence_update')
 async def on_presence_update(before, after):
     """Triggered when a member's presence changes (online/offline/etc.)"""
+    if event_log:
+        event_log.presence(before, after)
+    count_presence_change(before, after)
     # Only notify for online/offline changes, not idle/dnd
+    # Paused under load; the member counters above are still kept
+    if load_monitor.at_least(TIER_PAUSE_PRESENCE):
+        return
     if before.status != after.status:
-        channel = bot.get_channel(NOTIFY_CHANNEL_ID)
-        if channel:
-            # Online status changes
-            if after.status == discord.Status.online and before.status == discord.Status.offline:
-                embed = discord.Embed(
-                    title="Member Online",
-                    description=f"{after.mention} ({after.display_name}) is now online",
-                    color=discord.Color.green()
-                )
-                embed.set_thumbnail(url=after.avatar.url if after.avatar else after.default_avatar.url)
-                await channel.send(embed=embed)
-            
-            # Offline status changes
-            elif after.status == discord.Status.offline and before.status != discord.Status.offline:
-                embed = discord.Embed(
-                    title="Member Offline",
-                    description=f"{after.display_name} is now offline",
-                    color=discord.Color.greyple()
-                )
-                embed.set_thumbnail(url=after.avatar.url if after.avatar else after.default_avatar.url)
-                await channel.send(embed=embed)
+        # Online status changes
+        if after.status == discord.Status.online and before.status == discord.Status.offline:
+            presence_notices.update(after.id, False, True, after)
+        
+        # Offline status changes
+        elif after.status == discord.Status.offline and before.status != discord.Status.offline:
+            presence_notices.update(after.id, True, False, after)
 
 @bot.command(name='ping')
 async def ping(ctx):
@@ -226,22 +1254,44 @@ async def status(ctx):
     embed.add_field(name="Monitored Channel", value=f"<#{NOTIFY_CHANNEL_ID}>", inline=True)
     embed.add_field(name="Servers", value=len(bot.guilds), inline=True)
     embed.add_field(name="Latency", value=f"{round(bot.latency * 1000)}ms", inline=True)
+    afk_memory = afk_users.memory_report()
+    embed.add_field(
+        name="AFK Users",
+        value=f"{afk_memory['users']} ({afk_memory['total_bytes'] / 1024:.0f} KB, {afk_memory['unique_reasons']} reason(s))",
+        inline=True
+    )
+    embed.add_field(
+        name="Load Tier",
+        value=f"{load_monitor.tier} ({load_monitor.tier_name})\nLoop lag {load_monitor.lag * 1000:.0f}ms, {load_monitor.queued} queued",
+        inline=True
+    )
     await ctx.send(embed=embed)
 
 @bot.command(name='membercount')
 async def membercount(ctx):
     """Show current member count and online members"""
     guild = ctx.guild
-    if guild:
-        online_members = sum(1 for member in guild.members if member.status != discord.Status.offline)
+    if guild and STICKY_ONLY:
+        # No member or presence cache in this profile, only the gateway's member count
         embed = discord.Embed(
             title="Server Statistics",
+            description="Online tracking is disabled in the sticky-only profile.",
             color=discord.Color.blue(),
             timestamp=discord.utils.utcnow()
         )
         embed.add_field(name="Total Members", value=guild.member_count, inline=True)
-        embed.add_field(name="Online Members", value=online_members, inline=True)
-        embed.add_field(name="Offline Members", value=guild.member_count - online_members, inline=True)
+        embed.set_thumbnail(url=guild.icon.url if guild.icon else None)
+        await ctx.send(embed=embed)
+    elif guild:
+        counts = get_member_counts(guild)
+        embed = discord.Embed(
+            title="Server Statistics",
+            color=discord.Color.blue(),
+            timestamp=discord.utils.utcnow()
+        )
+        embed.add_field(name="Total Members", value=counts['total'], inline=True)
+        embed.add_field(name="Online Members", value=counts['online'], inline=True)
+        embed.add_field(name="Offline Members", value=max(0, counts['total'] - counts['online']), inline=True)
         embed.set_thumbnail(url=guild.icon.url if guild.icon else None)
         await ctx.send(embed=embed)
 
@@ -249,10 +1299,9 @@ async def membercount(ctx):
 @bot.tree.command(name="afk", description="Set your AFK status")
 async def afk_slash(interaction: discord.Interaction, reason: str = "No reason provided"):
     """Set AFK status"""
-    afk_users[interaction.user.id] = {
-        'reason': reason,
-        'time': datetime.utcnow()
-    }
+    set_afk(interaction.user.id, reason, interaction.guild_id)
+    if event_log:
+        event_log.afk(interaction.guild_id, interaction.user.id)
     
     embed = discord.Embed(
         title="AFK Status Set",
@@ -314,6 +1363,14 @@ async def ping_slash(interaction: discord.Interaction):
         description=f"**Latency:** {latency}ms\n**Status:** {status}",
         color=color
     )
+    
+    # Our own hot path, as opposed to the gateway round-trip above
+    if metrics.handler_latency.count('on_message'):
+        p50 = metrics.handler_latency.quantile(0.5, 'on_message') * 1000
+        p99 = metrics.handler_latency.quantile(0.99, 'on_message') * 1000
+        embed.add_field(name="on_message", value=f"p50 ≤ {p50:g}ms\np99 ≤ {p99:g}ms", inline=True)
+    embed.add_field(name="Sticky Reposts", value=f"{metrics.sticky_reposts.total():g}", inline=True)
+    embed.add_field(name="Rate Limits", value=f"{metrics.rate_limits.total():g}", inline=True)
     await interaction.response.send_message(embed=embed)
 
 @bot.tree.command(name="uptime", description="Check bot uptime")
@@ -373,11 +1430,12 @@ async def help_slash(interaction: discord.Interaction):
     embed.add_field(
         name="**Sticky Messages** (Manage Messages required)",
         value=(
-            "`/stick <message>` - Sticks message to channel\n"
+            "`/stick <message>` - Sticks message to channel (`add`, `starts_in`, `expires_in`, `rotate_every` for several)\n"
             "`/stickstop` - Stops sticky message\n"
             "`/stickstart` - Restarts stopped sticky\n"
             "`/stickremove` - Completely removes sticky\n"
-            "`/getstickies` - Show all server stickies"
+            "`/getstickies` - Show all server stickies\n"
+            "`/stickbulk` - Apply, stop, start, remove, export or import stickies across many channels"
         ),
         inline=False
     )
@@ -406,8 +1464,87 @@ async def help_slash(interaction: discord.Interaction):
     embed.set_footer(text="Bot is monitoring and ready!")
     await interaction.response.send_message(embed=embed)
 
+def paginate_entries(entries, separator="\n\n", limit=EMBED_DESCRIPTION_LIMIT):
+    """Group entries into pages that each fit in an embed description"""
+    pages = []
+    current = []
+    length = 0
+    for entry in entries:
+        entry = entry[:limit]
+        extra = len(entry) + (len(separator) if current else 0)
+        if current and length + extra > limit:
+            pages.append(separator.join(current))
+            current = []
+            extra = len(entry)
+            length = 0
+        current.append(entry)
+        length += extra
+    if current:
+        pages.append(separator.join(current))
+    return pages
+
+class EmbedPaginator(discord.ui.View):
+    """Previous/next buttons for flipping through a list of embeds"""
+    
+    def __init__(self, embeds, owner_id):
+        super().__init__(timeout=300)
+        self.embeds = embeds
+        self.owner_id = owner_id
+        self.index = 0
+        self._update_buttons()
+    
+    def _update_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index == len(self.embeds) - 1
+    
+    async def interaction_check(self, interaction: discord.Interaction):
+        return interaction.user.id == self.owner_id
+    
+    async def _show(self, interaction):
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.embeds[self.index], view=self)
+    
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary, emoji="◀️")
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = max(self.index - 1, 0)
+        await self._show(interaction)
+    
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary, emoji="▶️")
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = min(self.index + 1, len(self.embeds) - 1)
+        await self._show(interaction)
+
 @bot.tree.command(name="stick", description="Sticks a message to the channel")
-async def stick_message(interaction: discord.Interaction, message: str):
+@app_commands.describe(
+    message="The message to stick to this channel",
+    add="Add this sticky alongside the channel's existing stickies instead of replacing them",
+    starts_in="Only show this sticky after this many minutes (0 = now)",
+    expires_in="Remove this sticky after this many minutes (0 = never)",
+    rotate_every="Rotate between the channel's stickies every this many minutes (0 = show the first one)",
+    mode="How reposts are scheduled: instantly or once per burst of messages",
+    quiet_period="Seconds of inactivity before reposting (debounce mode)",
+    max_delay="Maximum seconds a repost can be delayed during a busy burst (debounce mode)",
+    repost_after_messages="Only repost once this many messages were sent since the last sticky",
+    repost_after_seconds="Also repost when this many seconds passed since the last sticky (0 = off)",
+    delivery="Post as the bot, or through a channel webhook with its own rate limits"
+)
+@app_commands.choices(mode=[
+    app_commands.Choice(name="Debounce (repost once per burst)", value="debounce"),
+    app_commands.Choice(name="Instant (repost after every message)", value="instant"),
+], delivery=[
+    app_commands.Choice(name="Bot (post as the bot)", value="bot"),
+    app_commands.Choice(name="Webhook (separate rate limits for busy channels)", value="webhook"),
+])
+async def stick_message(interaction: discord.Interaction, message: str, add: bool = False,
+                        starts_in: app_commands.Range[float, 0, 525600] = 0.0,
+                        expires_in: app_commands.Range[float, 0, 525600] = 0.0,
+                        rotate_every: app_commands.Range[float, 0, 10080] = None,
+                        mode: str = None,
+                        quiet_period: app_commands.Range[float, 0, 300] = None,
+                        max_delay: app_commands.Range[float, 0, 600] = None,
+                        repost_after_messages: app_commands.Range[int, 1, 1000] = None,
+                        repost_after_seconds: app_commands.Range[float, 0, 86400] = None,
+                        delivery: str = None):
     """Stick a message to the channel"""
     if not interaction.user.guild_permissions.manage_messages:
         embed = discord.Embed(
@@ -418,42 +1555,109 @@ async def stick_message(interaction: discord.Interaction, message: str):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    channel_id = interaction.channel.id
-    
-    # Remove existing sticky if any
-    if channel_id in sticky_messages:
-        old_data = sticky_messages[channel_id]
-        if old_data.get('last_message_id'):
-            try:
-                old_message = await interaction.channel.fetch_message(old_data['last_message_id'])
-                await old_message.delete()
-            except:
-                pass
-    
-    # Create new sticky
-    sticky_messages[channel_id] = {
-        'message': message,
-        'active': True,
-        'last_message_id': None
-    }
+    if expires_in and expires_in <= starts_in:
+        embed = discord.Embed(
+            title="❌ Invalid Schedule",
+            description="The sticky must expire after it starts.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
     
-    # Post the sticky message
-    sticky_embed = discord.Embed(
-        title="📌 Sticky Message",
-        description=message,
-        color=discord.Color.gold()
-    )
-    sticky_embed.set_footer(text="This message is pinned to this channel")
+    channel_id = interaction.channel.id
+    now = time.time()
+    starts_at = now + starts_in * 60 if starts_in else None
+    expires_at = now + expires_in * 60 if expires_in else None
     
-    sticky_msg = await interaction.channel.send(embed=sticky_embed)
-    sticky_messages[channel_id]['last_message_id'] = sticky_msg.id
+    # Waiting for the channel lock and the repost can outlast the 3s interaction deadline
+    await interaction.response.defer(ephemeral=True)
+    cancel_sticky_repost(channel_id)
+    async with sticky_lock(channel_id):
+        old_data = sticky_messages.get(channel_id)
+        # Settings that were not given are kept from the channel's existing sticky
+        previous = old_data or {}
+        if mode is not None or 'quiet_period' not in previous:
+            default_quiet, default_max = STICKY_REPOST_MODES[mode or DEFAULT_STICKY_MODE]
+        else:
+            default_quiet, default_max = previous['quiet_period'], previous['max_delay']
+        if quiet_period is None:
+            quiet_period = default_quiet
+        if max_delay is None:
+            max_delay = max(default_max, quiet_period)
+        if repost_after_messages is None:
+            repost_after_messages = previous.get('repost_after_messages', 1)
+        if repost_after_seconds is None:
+            repost_after_seconds = previous.get('repost_after_seconds', 0.0)
+        if rotate_every is None:
+            rotate_every = previous.get('rotate_every', 0.0) / 60
+        if delivery is None:
+            delivery = previous.get('delivery', 'bot')
+        
+        sticky_data = {
+            'entries': list(old_data['entries']) if add and old_data else [],
+            'message': old_data.get('message') if old_data else None,
+            'active': True,
+            'last_message_id': old_data.get('last_message_id') if old_data else None,
+            'quiet_period': quiet_period,
+            'max_delay': max_delay,
+            'repost_after_messages': repost_after_messages,
+            'repost_after_seconds': repost_after_seconds,
+            'rotate_every': rotate_every * 60,
+            'rotation_index': previous.get('rotation_index', 0),
+            'rotated_at': previous.get('rotated_at', now),
+            'delivery': delivery
+        }
+        # Keep using the channel's webhook rather than creating another one
+        for key in STICKY_WEBHOOK_KEYS:
+            if key in previous:
+                sticky_data[key] = previous[key]
+        entry = add_sticky_entry(sticky_data, message, starts_at, expires_at)
+        shown = sticky_data['message']
+        set_sticky(channel_id, interaction.guild.id, sticky_data)
+        
+        posted = True
+        if sticky_data['message'] and (not add or sticky_data['message'] != shown or not sticky_data['last_message_id']):
+            # Post the sticky message, deleting the old one alongside
+            await repost_sticky(interaction.channel, sticky_data, priority=PRIORITY_COMMAND)
+            posted = bool(sticky_data['last_message_id'])
+        elif not sticky_data['message'] and sticky_data['last_message_id']:
+            # The only sticky left is scheduled for later
+            await clear_sticky_post(interaction.channel, sticky_data, priority=PRIORITY_COMMAND)
+    if not posted:
+        embed = discord.Embed(
+            title="❌ Could Not Post Sticky",
+            description=f"The sticky was saved but could not be posted in {interaction.channel.mention}. Check my permissions.",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
     
+    if max_delay > 0:
+        schedule_str = f"Reposts after {quiet_period:g}s of quiet (at most {max_delay:g}s delay)"
+    else:
+        schedule_str = "Reposts after every message"
+    if repost_after_messages > 1 or repost_after_seconds:
+        threshold_str = f"{repost_after_messages} message(s)"
+        if repost_after_seconds:
+            threshold_str += f" or {repost_after_seconds:g}s"
+        schedule_str += f"\nWaits for {threshold_str} since the last sticky"
+    if starts_at:
+        schedule_str += f"\nStarts <t:{int(starts_at)}:R>"
+    if expires_at:
+        schedule_str += f"\nExpires <t:{int(expires_at)}:R>"
+    if rotate_every and len(sticky_data['entries']) > 1:
+        schedule_str += f"\nRotates between {len(sticky_data['entries'])} stickies every {rotate_every:g} minute(s)"
+    if delivery == 'webhook':
+        if sticky_data['delivery'] == 'webhook':
+            schedule_str += "\nPosted through a channel webhook"
+        else:
+            schedule_str += "\n⚠️ Could not create a webhook (needs Manage Webhooks), posting as the bot instead"
     embed = discord.Embed(
         title="✅ Sticky Message Created",
-        description=f"Successfully created sticky message in {interaction.channel.mention}",
+        description=f"Successfully created sticky #{entry['id']} in {interaction.channel.mention}\n{schedule_str}",
         color=discord.Color.green()
     )
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    await interaction.followup.send(embed=embed, ephemeral=True)
 
 @bot.tree.command(name="stickstop", description="Stops the stickied message in the channel")
 async def stick_stop(interaction: discord.Interaction):
@@ -478,7 +1682,7 @@ async def stick_stop(interaction: discord.Interaction):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-3    sticky_messages[channel_id]['active'] = False
+    stop_sticky(channel_id)
     
     embed = discord.Embed(
         title="⏸️ Sticky Message Stopped",
@@ -510,29 +1714,19 @@ async def stick_start(interaction: discord.Interaction):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    sticky_data = sticky_messages[channel_id]
-    sticky_data['active'] = True
-    
-    # Post the sticky message
-    sticky_embed = discord.Embed(
-        title="📌 Sticky Message",
-        description=sticky_data['message'],
-        color=discord.Color.gold()
-    )
-    sticky_embed.set_footer(text="This message is pinned to this channel")
-    
-    sticky_msg = await interaction.channel.send(embed=sticky_embed)
-    sticky_data['last_message_id'] = sticky_msg.id
+    await interaction.response.defer(ephemeral=True)
+    await start_sticky(interaction.channel, priority=PRIORITY_COMMAND)
     
     embed = discord.Embed(
         title="▶️ Sticky Message Restarted",
         description="The sticky message has been reactivated.",
         color=discord.Color.green()
     )
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    await interaction.followup.send(embed=embed, ephemeral=True)
 
 @bot.tree.command(name="stickremove", description="Stops and completely deletes the stickied message in this channel")
-async def stick_remove(interaction: discord.Interaction):
+@app_commands.describe(sticky_id="Only remove the sticky with this number (see /getstickies)")
+async def stick_remove(interaction: discord.Interaction, sticky_id: int = None):
     """Remove the sticky message from the channel"""
     if not interaction.user.guild_permissions.manage_messages:
         embed = discord.Embed(
@@ -554,24 +1748,40 @@ async def stick_remove(interaction: discord.Interaction):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    # Delete the sticky message if it exists
     sticky_data = sticky_messages[channel_id]
-    if sticky_data.get('last_message_id'):
-        try:
-            old_message = await interaction.channel.fetch_message(sticky_data['last_message_id'])
-            await old_message.delete()
-        except:
-            pass
+    entries = sticky_data['entries']
+    if sticky_id is not None and not any(entry['id'] == sticky_id for entry in entries):
+        embed = discord.Embed(
+            title="❌ No Such Sticky",
+            description=f"There is no sticky #{sticky_id} in this channel.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    # Removing the last sticky removes the whole sticky message
+    if sticky_id is not None and len(entries) > 1:
+        sticky_data['entries'] = [entry for entry in entries if entry['id'] != sticky_id]
+        state_writer.mark_sticky(channel_id)
+        # Shows whichever sticky is due now, reposting if that changed
+        update_sticky_display(channel_id, sticky_data)
+        embed = discord.Embed(
+            title="🗑️ Sticky Message Removed",
+            description=f"Sticky #{sticky_id} has been removed from this channel.",
+            color=discord.Color.green()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
     
-    # Remove from storage
-    del sticky_messages[channel_id]
+    await interaction.response.defer(ephemeral=True)
+    await delete_sticky(interaction.channel, priority=PRIORITY_COMMAND)
     
     embed = discord.Embed(
         title="🗑️ Sticky Message Removed",
         description="The sticky message has been completely removed from this channel.",
         color=discord.Color.green()
     )
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    await interaction.followup.send(embed=embed, ephemeral=True)
 
 @bot.tree.command(name="getstickies", description="Show all active and stopped stickies in your server")
 async def get_stickies(interaction: discord.Interaction):
@@ -587,13 +1797,26 @@ async def get_stickies(interaction: discord.Interaction):
     
     guild = interaction.guild
     server_stickies = []
+    now = time.time()
     
-    for channel_id, sticky_data in sticky_messages.items():
-        channel = guild.get_channel(channel_id)
-        if channel:
-            status = "🟢 Active" if sticky_data['active'] else "🔴 Stopped"
-            message_preview = sticky_data['message'][:50] + "..." if len(sticky_data['message']) > 50 else sticky_data['message']
-            server_stickies.append(f"**{channel.mention}** - {status}\n`{message_preview}`")
+    channels = [guild.get_channel(channel_id) for channel_id in guild_stickies.get(guild.id, ())]
+    for channel in sorted(filter(None, channels), key=lambda ch: ch.position):
+        sticky_data = sticky_messages[channel.id]
+        status = "🟢 Active" if sticky_data['active'] else "🔴 Stopped"
+        if sticky_data.get('rotate_every') and len(sticky_data['entries']) > 1:
+            status += f" • rotates every {sticky_data['rotate_every'] / 60:g} min"
+        lines = [f"**{channel.mention}** - {status}"]
+        for entry in sticky_data['entries']:
+            message_preview = entry['message'][:50] + "..." if len(entry['message']) > 50 else entry['message']
+            line = f"#{entry['id']} `{message_preview}`"
+            if entry['starts_at'] and entry['starts_at'] > now:
+                line += f" • starts <t:{int(entry['starts_at'])}:R>"
+            elif entry['message'] == sticky_data.get('message'):
+                line += " • showing"
+            if entry['expires_at']:
+                line += f" • expires <t:{int(entry['expires_at'])}:R>"
+            lines.append(line)
+        server_stickies.append("\n".join(lines))
     
     if not server_stickies:
         embed = discord.Embed(
@@ -601,14 +1824,384 @@ async def get_stickies(interaction: discord.Interaction):
             description="No sticky messages found in this server.",
             color=discord.Color.blue()
         )
-    else:
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    pages = paginate_entries(server_stickies)
+    embeds = []
+    for number, page in enumerate(pages, start=1):
         embed = discord.Embed(
             title="📌 Server Sticky Messages",
-            description="\n\n".join(server_stickies),
+            description=page,
             color=discord.Color.blue()
         )
-        embed.set_footer(text=f"Total: {len(server_stickies)} sticky message(s)")
+        embed.set_footer(text=f"Total: {len(server_stickies)} sticky message(s) • Page {number}/{len(pages)}")
+        embeds.append(embed)
     
+    if len(embeds) == 1:
+        await interaction.response.send_message(embed=embeds[0], ephemeral=True)
+    else:
+        await interaction.response.send_message(embed=embeds[0], view=EmbedPaginator(embeds, interaction.user.id), ephemeral=True)
+
+def new_sticky_data(message, mode=DEFAULT_STICKY_MODE, delivery='bot'):
+    """Sticky config with a single entry and a mode's default repost schedule"""
+    quiet_period, max_delay = STICKY_REPOST_MODES[mode]
+    sticky_data = {
+        'entries': [],
+        'message': None,
+        'active': True,
+        'last_message_id': None,
+        'quiet_period': quiet_period,
+        'max_delay': max(max_delay, quiet_period),
+        'repost_after_messages': 1,
+        'repost_after_seconds': 0.0,
+        'rotate_every': 0.0,
+        'rotation_index': 0,
+        'rotated_at': time.time(),
+        'delivery': delivery
+    }
+    add_sticky_entry(sticky_data, message)
+    return sticky_data
+
+# Sticky settings carried by an export, with the defaults used when an import leaves them out
+STICKY_EXPORT_SETTINGS = {
+    'active': True,
+    'quiet_period': STICKY_REPOST_MODES[DEFAULT_STICKY_MODE][0],
+    'max_delay': STICKY_REPOST_MODES[DEFAULT_STICKY_MODE][1],
+    'repost_after_messages': 1,
+    'repost_after_seconds': 0.0,
+    'rotate_every': 0.0,
+    'delivery': 'bot',
+}
+STICKY_IMPORT_MAX_BYTES = 1024 * 1024
+
+def export_guild_stickies(guild):
+    """A guild's sticky config as a JSON-serializable dict"""
+    stickies = []
+    for channel_id in sorted(guild_stickies.get(guild.id, ())):
+        sticky_data = sticky_messages[channel_id]
+        channel = guild.get_channel(channel_id)
+        sticky = {'channel_id': channel_id, 'channel_name': channel.name if channel else None}
+        sticky.update({key: sticky_data.get(key, default) for key, default in STICKY_EXPORT_SETTINGS.items()})
+        sticky['entries'] = [dict(entry) for entry in sticky_data['entries']]
+        stickies.append(sticky)
+    return {'version': STICKY_EXPORT_VERSION, 'guild_id': guild.id, 'stickies': stickies}
+
+# Bounds for imported numeric settings, matching what /stick accepts (rotate_every is in seconds here)
+STICKY_IMPORT_LIMITS = {
+    'quiet_period': (0, 300),
+    'max_delay': (0, 600),
+    'repost_after_messages': (1, 1000),
+    'repost_after_seconds': (0, 86400),
+    'rotate_every': (0, 10080 * 60),
+}
+
+def _import_setting(key, value, default):
+    """Check one imported setting against the type of its default, without coercing it"""
+    if isinstance(default, bool) or isinstance(default, str):
+        if type(value) is not type(default):
+            raise ValueError(f"{key} must be {'true or false' if isinstance(default, bool) else 'a string'}")
+        return value
+    # JSON booleans are ints in Python, but never a valid number here
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} must be a number")
+    low, high = STICKY_IMPORT_LIMITS[key]
+    if not low <= value <= high:
+        raise ValueError(f"{key} must be between {low} and {high}")
+    if isinstance(default, int) and value != int(value):
+        raise ValueError(f"{key} must be a whole number")
+    return type(default)(value)
+
+# Imported entries may be scheduled as far ahead as /stick allows (525600 minutes)
+STICKY_IMPORT_HORIZON = 525600 * 60
+
+def _import_timestamp(key, value, now):
+    """An imported entry's start or expiry time, or None when it has none"""
+    if value is None or value == 0:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{key} must be a timestamp")
+    if not 0 < value <= now + STICKY_IMPORT_HORIZON:
+        raise ValueError(f"{key} is out of range")
+    return float(value)
+
+def parse_sticky_import(guild, payload):
+    """Match an export's stickies to this guild's channels: returns ([(channel, sticky_data)], [problem])"""
+    if not isinstance(payload, dict) or payload.get('version') != STICKY_EXPORT_VERSION or not isinstance(payload.get('stickies'), list):
+        raise ValueError(f"Not a version {STICKY_EXPORT_VERSION} sticky export")
+    
+    now = time.time()
+    channels_by_name = {channel.name: channel for channel in reversed(guild.text_channels)}
+    imported = {}
+    problems = []
+    for number, sticky in enumerate(payload['stickies'], start=1):
+        if not isinstance(sticky, dict):
+            problems.append(f"#{number}: invalid sticky (not an object)")
+            continue
+        try:
+            channel = guild.get_channel(int(sticky.get('channel_id') or 0))
+            if not isinstance(channel, discord.TextChannel):
+                # Categories and voice channels can't hold a sticky
+                channel = channels_by_name.get(sticky.get('channel_name'))
+            if channel is None:
+                problems.append(f"#{number}: no channel `{sticky.get('channel_name') or sticky.get('channel_id')}` in this server")
+                continue
+            
+            sticky_data = {key: _import_setting(key, sticky.get(key, default), default) for key, default in STICKY_EXPORT_SETTINGS.items()}
+            if sticky_data['delivery'] not in STICKY_DELIVERY_MODES:
+                raise ValueError(f"unknown delivery {sticky_data['delivery']!r}")
+            sticky_data.update({'entries': [], 'message': None, 'last_message_id': None, 'rotation_index': 0, 'rotated_at': now})
+            if not isinstance(sticky['entries'], list):
+                raise ValueError("entries must be a list")
+            for entry in sticky['entries']:
+                if not isinstance(entry, dict):
+                    raise ValueError("entry is not an object")
+                if not isinstance(entry.get('message'), str) or not entry['message']:
+                    raise ValueError("entry without a message")
+                starts_at = _import_timestamp('starts_at', entry.get('starts_at'), now)
+                expires_at = _import_timestamp('expires_at', entry.get('expires_at'), now)
+                if starts_at and expires_at and expires_at <= starts_at:
+                    raise ValueError("entry expires before it starts")
+                # Entries that expired since the export are dropped
+                if expires_at is None or expires_at > now:
+                    add_sticky_entry(sticky_data, entry['message'][:EMBED_DESCRIPTION_LIMIT], starts_at, expires_at)
+            if not sticky_data['entries']:
+                problems.append(f"#{number}: every sticky for {channel.mention} has expired")
+                continue
+            imported[channel.id] = (channel, sticky_data)
+        except (KeyError, TypeError, ValueError) as e:
+            problems.append(f"#{number}: invalid sticky ({e})")
+    return list(imported.values()), problems
+
+def resolve_bulk_channels(guild, channels=None, category=None):
+    """Text channels named by mentions/IDs in a string and/or under a category, in order, without duplicates"""
+    resolved = {}
+    for match in re.finditer(r'<#(\d+)>|\b(\d+)\b', channels or ''):
+        channel = guild.get_channel(int(match.group(1) or match.group(2)))
+        if isinstance(channel, discord.TextChannel):
+            resolved[channel.id] = channel
+    if category is not None:
+        for channel in category.text_channels:
+            resolved[channel.id] = channel
+    return list(resolved.values())
+
+def bulk_job_embed(job):
+    """Progress or final report for a bulk sticky job"""
+    if job.finished is None:
+        title, color = "⏳ Bulk Sticky Job Running", discord.Color.blue()
+    elif job.cancelled:
+        title, color = "⏹️ Bulk Sticky Job Cancelled", discord.Color.orange()
+    elif job.failed:
+        title, color = "⚠️ Bulk Sticky Job Finished With Errors", discord.Color.orange()
+    else:
+        title, color = "✅ Bulk Sticky Job Finished", discord.Color.green()
+    
+    description = f"**{job.name}**: {job.done}/{job.total} channel(s) done, {len(job.failed)} failed, {job.elapsed():.0f}s"
+    failures = [f"{getattr(channel, 'mention', channel)}: {error}" for channel, error in job.failed[:10]]
+    if len(job.failed) > 10:
+        failures.append(f"...and {len(job.failed) - 10} more")
+    if failures:
+        description += "\n\n" + "\n".join(failures)
+    return discord.Embed(title=title, description=description[:EMBED_DESCRIPTION_LIMIT], color=color)
+
+async def start_bulk_job(interaction, name, channels, action, notes=()):
+    """Run action over channels as the guild's bulk job, reporting progress by editing the command response"""
+    job = bulk_jobs.get(interaction.guild.id)
+    if job and job.running:
+        embed = discord.Embed(
+            title="❌ Job Already Running",
+            description=f"**{job.name}** is still running ({job.done}/{job.total}). Use `/stickbulk cancel` to stop it.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    if not channels:
+        embed = discord.Embed(
+            title="❌ No Channels",
+            description="No text channels matched. Pass channel mentions or IDs, or a category.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    async def report(job):
+        await interaction.edit_original_response(embed=bulk_job_embed(job))
+    
+    job = bulk_jobs[interaction.guild.id] = BulkJob(name, channels, action, concurrency=BULK_STICKY_CONCURRENCY, on_progress=report)
+    embed = bulk_job_embed(job)
+    if notes:
+        embed.add_field(name="Skipped", value="\n".join(notes[:10])[:1024], inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+    job.start()
+
+async def _require_manage_messages(interaction):
+    if interaction.user.guild_permissions.manage_messages:
+        return True
+    embed = discord.Embed(
+        title="❌ Permission Denied",
+        description="You need the 'Manage Messages' permission to use this command.",
+        color=discord.Color.red()
+    )
     await interaction.response.send_message(embed=embed, ephemeral=True)
+    return False
 
-bot.run('token')
+stickbulk = app_commands.Group(name="stickbulk", description="Manage stickies across many channels at once", guild_only=True)
+
+@stickbulk.command(name="apply", description="Stick a message to many channels, replacing their stickies")
+@app_commands.describe(
+    message="The message to stick",
+    channels="Channel mentions or IDs, separated by spaces",
+    category="Every text channel in this category",
+    mode="How reposts are scheduled: instantly or once per burst of messages",
+    delivery="Post as the bot, or through a channel webhook with its own rate limits"
+)
+@app_commands.choices(mode=[
+    app_commands.Choice(name="Debounce (repost once per burst)", value="debounce"),
+    app_commands.Choice(name="Instant (repost after every message)", value="instant"),
+], delivery=[
+    app_commands.Choice(name="Bot (post as the bot)", value="bot"),
+    app_commands.Choice(name="Webhook (separate rate limits for busy channels)", value="webhook"),
+])
+async def stickbulk_apply(interaction: discord.Interaction, message: str, channels: str = None,
+                          category: discord.CategoryChannel = None, mode: str = DEFAULT_STICKY_MODE,
+                          delivery: str = 'bot'):
+    """Stick a message to every selected channel"""
+    if not await _require_manage_messages(interaction):
+        return
+    
+    async def apply(channel):
+        if not await replace_sticky(channel, new_sticky_data(message, mode, delivery)):
+            raise RuntimeError("saved but could not be posted")
+    
+    await start_bulk_job(interaction, "Apply sticky", resolve_bulk_channels(interaction.guild, channels, category), apply)
+
+@stickbulk.command(name="stop", description="Stop the stickies in many channels")
+@app_commands.describe(channels="Channel mentions or IDs, separated by spaces", category="Every text channel in this category")
+async def stickbulk_stop(interaction: discord.Interaction, channels: str = None, category: discord.CategoryChannel = None):
+    """Stop the sticky in every selected channel"""
+    if not await _require_manage_messages(interaction):
+        return
+    
+    async def stop(channel):
+        stop_sticky(channel.id)
+    
+    targets = [channel for channel in resolve_bulk_channels(interaction.guild, channels, category) if channel.id in sticky_messages]
+    await start_bulk_job(interaction, "Stop stickies", targets, stop)
+
+@stickbulk.command(name="start", description="Restart the stopped stickies in many channels")
+@app_commands.describe(channels="Channel mentions or IDs, separated by spaces", category="Every text channel in this category")
+async def stickbulk_start(interaction: discord.Interaction, channels: str = None, category: discord.CategoryChannel = None):
+    """Restart the sticky in every selected channel"""
+    if not await _require_manage_messages(interaction):
+        return
+    
+    targets = [channel for channel in resolve_bulk_channels(interaction.guild, channels, category) if channel.id in sticky_messages]
+    await start_bulk_job(interaction, "Start stickies", targets, start_sticky)
+
+@stickbulk.command(name="remove", description="Completely delete the stickies in many channels")
+@app_commands.describe(channels="Channel mentions or IDs, separated by spaces", category="Every text channel in this category")
+async def stickbulk_remove(interaction: discord.Interaction, channels: str = None, category: discord.CategoryChannel = None):
+    """Remove the sticky from every selected channel"""
+    if not await _require_manage_messages(interaction):
+        return
+    
+    targets = [channel for channel in resolve_bulk_channels(interaction.guild, channels, category) if channel.id in sticky_messages]
+    await start_bulk_job(interaction, "Remove stickies", targets, delete_sticky)
+
+@stickbulk.command(name="export", description="Download this server's sticky config as JSON")
+async def stickbulk_export(interaction: discord.Interaction):
+    """Export every sticky in the server"""
+    if not await _require_manage_messages(interaction):
+        return
+    
+    export = export_guild_stickies(interaction.guild)
+    data = json.dumps(export, indent=2, ensure_ascii=False).encode()
+    embed = discord.Embed(
+        title="📦 Sticky Export",
+        description=f"Exported {len(export['stickies'])} sticky channel(s). Use `/stickbulk import` to restore them.",
+        color=discord.Color.blue()
+    )
+    await interaction.response.send_message(
+        embed=embed, file=discord.File(io.BytesIO(data), filename=f"stickies-{interaction.guild.id}.json"), ephemeral=True
+    )
+
+@stickbulk.command(name="import", description="Apply a sticky config exported with /stickbulk export")
+@app_commands.describe(file="The JSON file from /stickbulk export")
+async def stickbulk_import(interaction: discord.Interaction, file: discord.Attachment):
+    """Import stickies from an export, replacing the stickies in the channels it names"""
+    if not await _require_manage_messages(interaction):
+        return
+    
+    try:
+        if file.size > STICKY_IMPORT_MAX_BYTES:
+            raise ValueError(f"File is larger than {STICKY_IMPORT_MAX_BYTES // 1024} KB")
+        imported, problems = parse_sticky_import(interaction.guild, json.loads(await file.read()))
+    except (ValueError, discord.HTTPException) as e:
+        embed = discord.Embed(
+            title="❌ Invalid Import",
+            description=f"Could not read `{file.filename}`: {e}",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    configs = {channel.id: sticky_data for channel, sticky_data in imported}
+    
+    async def apply(channel):
+        if not await replace_sticky(channel, configs[channel.id]):
+            raise RuntimeError("saved but could not be posted")
+    
+    await start_bulk_job(interaction, "Import stickies", [channel for channel, _ in imported], apply, notes=problems)
+
+@stickbulk.command(name="status", description="Show the progress of this server's bulk sticky job")
+async def stickbulk_status(interaction: discord.Interaction):
+    """Report on the server's current or last bulk job"""
+    if not await _require_manage_messages(interaction):
+        return
+    
+    job = bulk_jobs.get(interaction.guild.id)
+    if job is None:
+        embed = discord.Embed(
+            title="📌 Bulk Sticky Jobs",
+            description="No bulk sticky job has run in this server.",
+            color=discord.Color.blue()
+        )
+    else:
+        embed = bulk_job_embed(job)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@stickbulk.command(name="cancel", description="Cancel this server's running bulk sticky job")
+async def stickbulk_cancel(interaction: discord.Interaction):
+    """Cancel the server's running bulk job; channels already done stay done"""
+    if not await _require_manage_messages(interaction):
+        return
+    
+    job = bulk_jobs.get(interaction.guild.id)
+    if job is None or not job.running:
+        embed = discord.Embed(
+            title="❌ No Running Job",
+            description="There is no bulk sticky job running in this server.",
+            color=discord.Color.red()
+        )
+    else:
+        job.cancel()
+        embed = discord.Embed(
+            title="⏹️ Bulk Sticky Job Cancelled",
+            description=f"Stopped **{job.name}** after {job.done}/{job.total} channel(s).",
+            color=discord.Color.orange()
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+bot.tree.add_command(stickbulk)
+
+if __name__ == '__main__':
+    # Stop on SIGTERM the way bot.run stops on Ctrl+C, so the state below is still flushed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        bot.run(os.getenv('DISCORD_TOKEN', 'token'))
+    finally:
+        # Persist anything still waiting in the write-behind buffer
+        state_writer.flush_now()
+        state_store.close()
+        if event_log:
+            event_log.close()
@@ -0,0 +1,241 @@
+import functools
+import logging
+import re
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+# Latency buckets in seconds, from sub-millisecond handler work up to slow REST round-trips
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = defaultdict(float)
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] += amount
+
+    def total(self):
+        return sum(self.values.values())
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for label_values, value in self.values.items():
+            lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value:g}')
+        return lines
+
+
+class Gauge:
+    """Value that can go up and down, with optional labels"""
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def set(self, value, *label_values):
+        self.values[label_values] = value
+
+    def get(self, *label_values):
+        return self.values.get(label_values, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        for label_values, value in self.values.items():
+            lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value:g}')
+        return lines
+
+
+class Histogram:
+    """Cumulative bucket histogram with optional labels"""
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # {label_values: [per-bucket counts..., +Inf count, sum]}
+        self.values = {}
+
+    def observe(self, value, *label_values):
+        series = self.values.get(label_values)
+        if series is None:
+            series = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *label_values):
+        series = self.values.get(label_values)
+        return sum(series[:-1]) if series else 0
+
+    def quantile(self, q, *label_values):
+        """Estimate a quantile as the upper bound of the bucket it falls in"""
+        series = self.values.get(label_values)
+        if not series:
+            return None
+        target = q * sum(series[:-1])
+        seen = 0
+        for bound, count in zip(self.buckets, series):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for label_values, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                labels = _format_labels(self.labels + ('le',), label_values + (bound,))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {series[-1]:g}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, documentation, labels=()):
+        metric = Counter(name, documentation, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, labels=()):
+        metric = Gauge(name, documentation, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+handler_latency = REGISTRY.histogram(
+    'bot_handler_latency_seconds', 'Time spent in event handlers', labels=('handler',)
+)
+sticky_reposts = REGISTRY.counter(
+    'bot_sticky_reposts_total', 'Sticky messages reposted', labels=('guild',)
+)
+sticky_deletes = REGISTRY.counter(
+    'bot_sticky_deletes_total', 'Attempts to delete a previous sticky message', labels=('guild', 'result')
+)
+sticky_orphans = REGISTRY.counter(
+    'bot_sticky_orphans_deleted_total', 'Stale sticky messages removed by the startup reconciliation sweep'
+)
+http_errors = REGISTRY.counter(
+    'bot_http_errors_total', 'Discord API errors surfaced to the bot', labels=('guild', 'status')
+)
+rate_limits = REGISTRY.counter(
+    'bot_rate_limits_total', 'Rate limits hit and retried by discord.py', labels=('route',)
+)
+global_rate_limits = REGISTRY.counter(
+    'bot_global_rate_limits_total', 'Of those, rate limits Discord applied to the whole bot'
+)
+
+
+def timed(handler_name):
+    """Record a coroutine's run time in the handler latency histogram"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                handler_latency.observe(time.perf_counter() - started, handler_name)
+        return wrapper
+    return decorator
+
+
+def record_http_error(guild_id, error):
+    """Count a discord.HTTPException (or subclass) against a guild"""
+    http_errors.inc(str(guild_id), str(getattr(error, 'status', 'unknown')))
+
+
+_API_PATH = re.compile(r'^\w+://[^/]+/api(?:/v\d+)?')
+_SNOWFLAKE = re.compile(r'^\d{15,}$')
+# The segment after these resources' IDs is a token, which must not end up in a label
+_TOKEN_AFTER = ('webhooks', 'interactions')
+
+
+def route_label(method, url):
+    """POST https://discord.com/api/v10/channels/123/messages -> POST /channels/{id}/messages"""
+    segments = _API_PATH.sub('', url.split('?', 1)[0]).split('/')
+    for i in range(1, len(segments)):
+        if _SNOWFLAKE.match(segments[i]):
+            segments[i] = '{id}'
+        elif i >= 2 and segments[i - 1] == '{id}' and segments[i - 2] in _TOKEN_AFTER:
+            segments[i] = '{token}'
+        elif segments[i - 1] == 'reactions':
+            segments[i] = '{emoji}'
+    return f"{method} {'/'.join(segments)}"
+
+
+class RateLimitLogHandler(logging.Handler):
+    """Counts the 429 warnings discord.py logs while it retries requests
+
+    discord.http logs one warning per retried 429 with the method and URL,
+    and a second one when the 429 was global; webhooks sent through
+    discord.webhook.async_ log their own warning with only the webhook ID.
+    """
+
+    def emit(self, record):
+        message = record.msg if isinstance(record.msg, str) else ''
+        if 'responded with 429. Retrying in' in message:
+            method, url = record.args[:2]
+            rate_limits.inc(route_label(method, str(url)))
+        elif message.startswith('Global rate limit has been hit'):
+            global_rate_limits.inc()
+        elif 'is rate limited. Retrying in' in message:
+            rate_limits.inc('webhook')
+
+
+def install_rate_limit_counter():
+    handler = RateLimitLogHandler(logging.WARNING)
+    for name in ('discord.http', 'discord.webhook.async_'):
+        logger = logging.getLogger(name)
+        # Installing twice would count every rate limit twice
+        if not any(isinstance(existing, RateLimitLogHandler) for existing in logger.handlers):
+            logger.addHandler(handler)
+
+
+async def start_http_server(port, host='127.0.0.1'):
+    """Serve the registry in Prometheus text format on /metrics"""
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=REGISTRY.render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from collections import Counter, deque
+
+from timerwheel import TimerWheel
+
+# Discord accepts at most 10 embeds per message
+MAX_EMBEDS_PER_MESSAGE = 10
+
+
+class NotificationBatcher:
+    """Buffers notification embeds and sends them to one channel as digests.
+
+    Embeds are flushed in groups of up to 10 per message once a full group is
+    queued or flush_interval seconds after the first pending embed. When the
+    backlog grows past summarize_after the whole backlog is collapsed into a
+    single text summary, and anything pushed beyond max_queue is dropped and
+    only counted.
+    """
+
+    def __init__(self, get_channel, flush_interval=2.0, max_queue=500, summarize_after=50, send=None):
+        self.get_channel = get_channel
+        self.send = send or (lambda channel, *args, **kwargs: channel.send(*args, **kwargs))
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.summarize_after = summarize_after
+        self.queue = deque()
+        self.dropped = Counter()
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def push(self, embed):
+        if len(self.queue) >= self.max_queue:
+            self.dropped[embed.title] += 1
+        else:
+            self.queue.append(embed)
+        if len(self.queue) >= MAX_EMBEDS_PER_MESSAGE:
+            self.wakeup.set()
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self.queue or self.dropped:
+            if len(self.queue) < MAX_EMBEDS_PER_MESSAGE:
+                # Give the batch a chance to fill up before sending
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Failed to send notifications: {e}")
+
+    async def flush(self):
+        """Send one batch, or a summary of the whole backlog if it is too large"""
+        channel = self.get_channel()
+        if channel is None:
+            self.queue.clear()
+            self.dropped.clear()
+            return
+
+        if len(self.queue) > self.summarize_after:
+            counts = Counter(embed.title for embed in self.queue)
+            counts.update(self.dropped)
+            self.queue.clear()
+            self.dropped.clear()
+            await self.send(channel, self._summary(counts))
+            return
+
+        batch = [self.queue.popleft() for _ in range(min(MAX_EMBEDS_PER_MESSAGE, len(self.queue)))]
+        if batch:
+            await self.send(channel, embeds=batch)
+        if self.dropped and not self.queue:
+            counts = self.dropped.copy()
+            self.dropped.clear()
+            await self.send(channel, self._summary(counts, skipped=True))
+
+    @staticmethod
+    def _summary(counts, skipped=False):
+        header = "⚠️ Skipped notifications during a burst:" if skipped else "📋 Notification summary:"
+        lines = [f"• **{title}**: {count}" for title, count in counts.most_common()]
+        return "\n".join([header] + lines)[:2000]
+
+
+class PresenceDebouncer:
+    """Collapses a user's online/offline transitions into at most one notice per window.
+
+    on_presence_update fires once per guild the bot shares with a user, so
+    one status change arrives many times. The first transition opens a
+    window for that user; later events inside it only update the user's
+    latest state. When the window closes a notice is emitted only if that
+    state differs from the one before the window opened, so a user flapping
+    online -> offline -> online produces nothing. A notice already emitted
+    also swallows late copies of the same transition for dedup_ttl seconds.
+    With a window of 0, transitions are emitted straight away and only
+    deduplicated.
+    """
+
+    def __init__(self, emit, window=5.0, dedup_ttl=60.0, clock=time.time):
+        self.emit = emit
+        self.window = window
+        self.dedup_ttl = dedup_ttl
+        self.clock = clock
+        self.pending = {}  # {user_id: [was_online, is_online, member]}
+        self.emitted = {}  # {user_id: (is_online, emitted_at)}, oldest first
+        self.suppressed = Counter()
+        self.timers = TimerWheel(self._close, tick=min(1.0, window) if window > 0 else 1.0, clock=clock)
+
+    def update(self, user_id, was_online, is_online, member):
+        entry = self.pending.get(user_id)
+        if entry is not None:
+            entry[1] = is_online
+            entry[2] = member
+            self.suppressed['duplicate'] += 1
+            return
+        now = self.clock()
+        last = self.emitted.get(user_id)
+        if last is not None and last[0] == is_online and now - last[1] < self.dedup_ttl:
+            self.suppressed['duplicate'] += 1
+            return
+        self.pending[user_id] = [was_online, is_online, member]
+        if self.window > 0:
+            self.timers.schedule(user_id, now + self.window)
+        else:
+            self._close(user_id)
+
+    def _close(self, user_id):
+        was_online, is_online, member = self.pending.pop(user_id)
+        if was_online == is_online:
+            self.suppressed['flap'] += 1
+            return
+        now = self.clock()
+        self.emitted.pop(user_id, None)
+        self.emitted[user_id] = (is_online, now)
+        # Emitted in time order, so expired entries are all at the front
+        for old_user_id, (_, emitted_at) in list(self.emitted.items()):
+            if now - emitted_at < self.dedup_ttl:
+                break
+            del self.emitted[old_user_id]
+        self.emit(member, is_online)
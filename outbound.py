@@ -0,0 +1,233 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+import metrics
+
+# Priority classes, lower runs first
+PRIORITY_COMMAND = 0
+PRIORITY_STICKY = 1
+PRIORITY_AFK = 2
+PRIORITY_NOTIFY = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_COMMAND: 'command',
+    PRIORITY_STICKY: 'sticky',
+    PRIORITY_AFK: 'afk',
+    PRIORITY_NOTIFY: 'notify',
+}
+
+queue_wait = metrics.REGISTRY.histogram(
+    'bot_outbound_wait_seconds', 'Time requests spent queued before being sent', labels=('priority',)
+)
+superseded_requests = metrics.REGISTRY.counter(
+    'bot_outbound_superseded_total', 'Queued requests dropped because a newer one replaced them'
+)
+
+
+class Superseded(Exception):
+    """Set on a queued request that was replaced before it was sent"""
+
+
+class TokenBucket:
+    """Local view of a Discord rate limit bucket"""
+
+    def __init__(self, capacity, per):
+        self.capacity = capacity
+        self.rate = capacity / per
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now):
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+    def wait_time(self, now):
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class _Request:
+    __slots__ = ('priority', 'seq', 'route', 'key', 'factory', 'tag', 'future', 'queued_at', 'dropped')
+
+    def __init__(self, priority, seq, route, key, factory, tag, future):
+        self.priority = priority
+        self.seq = seq
+        self.route = route
+        self.key = key
+        self.factory = factory
+        self.tag = tag
+        self.future = future
+        self.queued_at = time.monotonic()
+        self.dropped = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundQueue:
+    """Schedules outgoing REST calls by priority and per-route rate limits.
+
+    Each request names a route (e.g. 'send') and a bucket key (e.g. a channel
+    ID). Routes listed in route_limits get a local token bucket per key, and a
+    request only starts once its bucket has room, so an exhausted channel
+    bucket never ties up a slot that higher priority work elsewhere could
+    use. Requests behind an exhausted bucket are parked per bucket and only
+    return to the queue as its tokens refill, so a long backlog on one
+    channel costs nothing while it waits. Requests can carry a tag;
+    superseding a tag drops every request with that tag still waiting in the
+    queue. A request whose caller stopped waiting (its future was cancelled)
+    is dropped instead of sent.
+    """
+
+    def __init__(self, route_limits, concurrency=16):
+        self.route_limits = route_limits
+        self.concurrency = concurrency
+        self.heap = []  # requests that may be able to start now
+        self.parked = {}  # {(route, key): heap of requests waiting for that bucket}
+        self.parked_count = 0
+        self.refills = []  # heap of (monotonic time, (route, key)) when a parked bucket has tokens again
+        self.seq = itertools.count()
+        self.buckets = {}
+        self.tagged = {}
+        self.wakeup = asyncio.Event()
+        self.slots = None
+        self.task = None
+        self.active = 0  # requests started and not finished yet
+
+    def __len__(self):
+        return len(self.heap) + self.parked_count
+
+    def submit(self, priority, route, key, factory, tag=None):
+        """Queue factory() to run as a request and return a future for its result"""
+        future = asyncio.get_running_loop().create_future()
+        request = _Request(priority, next(self.seq), route, key, factory, tag, future)
+        heapq.heappush(self.heap, request)
+        if tag is not None:
+            self.tagged.setdefault(tag, []).append(request)
+        self.wakeup.set()
+        if self.task is None or self.task.done():
+            self.slots = asyncio.Semaphore(self.concurrency)
+            self.task = asyncio.create_task(self._dispatch())
+        return future
+
+    def supersede(self, tag):
+        """Drop every request with this tag that has not started yet"""
+        for request in self.tagged.pop(tag, ()):
+            if not request.dropped and not request.future.done():
+                request.dropped = True
+                request.future.set_exception(Superseded())
+                # Nobody may be awaiting it any more
+                request.future.exception()
+                superseded_requests.inc()
+
+    def _bucket(self, route, key):
+        limit = self.route_limits.get(route)
+        if limit is None:
+            return None
+        bucket = self.buckets.get((route, key))
+        if bucket is None:
+            bucket = self.buckets[(route, key)] = TokenBucket(*limit)
+        return bucket
+
+    def _untag(self, request):
+        if request.tag is not None:
+            pending = self.tagged.get(request.tag)
+            if pending and request in pending:
+                pending.remove(request)
+                if not pending:
+                    del self.tagged[request.tag]
+
+    def _park(self, request, bucket, now):
+        key = (request.route, request.key)
+        parked = self.parked.get(key)
+        if parked is None:
+            parked = self.parked[key] = []
+            heapq.heappush(self.refills, (now + bucket.wait_time(now), key))
+        heapq.heappush(parked, request)
+        self.parked_count += 1
+
+    def _unpark(self, now):
+        """Move requests whose bucket has refilled back to the queue, as many as it has tokens for"""
+        while self.refills and self.refills[0][0] <= now:
+            _, key = heapq.heappop(self.refills)
+            parked = self.parked.pop(key, None)
+            if not parked:
+                continue
+            bucket = self._bucket(*key)
+            bucket._refill(now)
+            moved = max(1, min(len(parked), int(bucket.tokens)))
+            for _ in range(moved):
+                heapq.heappush(self.heap, heapq.heappop(parked))
+            self.parked_count -= moved
+            if parked:
+                # The rest wait for the tokens after the ones just handed out
+                self.parked[key] = parked
+                ready_at = now + max(0.0, moved + 1 - bucket.tokens) / bucket.rate
+                heapq.heappush(self.refills, (ready_at, key))
+
+    def _next_ready(self):
+        """Pop the highest priority request whose bucket has room, or return how long to wait"""
+        now = time.monotonic()
+        self._unpark(now)
+        while self.heap:
+            request = heapq.heappop(self.heap)
+            if request.dropped or request.future.done():
+                # Superseded, or the caller was cancelled and nobody wants the result
+                self._untag(request)
+                continue
+            bucket = self._bucket(request.route, request.key)
+            if bucket is None or bucket.try_take(now):
+                return request, None
+            self._park(request, bucket, now)
+        wait = max(0.0, self.refills[0][0] - now) if self.refills else None
+        return None, wait
+
+    async def _dispatch(self):
+        while True:
+            await self.slots.acquire()
+            request, wait = self._next_ready()
+            if request is None:
+                self.slots.release()
+                if not self.heap and not self.parked:
+                    # Forget buckets that have fully recovered
+                    now = time.monotonic()
+                    self.buckets = {key: bucket for key, bucket in self.buckets.items() if not bucket.full(now)}
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._untag(request)
+            self.active += 1
+            asyncio.create_task(self._run(request))
+
+    async def _run(self, request):
+        queue_wait.observe(time.monotonic() - request.queued_at, PRIORITY_NAMES.get(request.priority, str(request.priority)))
+        try:
+            result = await request.factory()
+        except asyncio.CancelledError:
+            request.future.cancel()
+            raise
+        except Exception as e:
+            if not request.future.done():
+                request.future.set_exception(e)
+        else:
+            if not request.future.done():
+                request.future.set_result(result)
+        finally:
+            self.active -= 1
+            self.slots.release()
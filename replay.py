@@ -0,0 +1,225 @@
+"""Replay a captured gateway event log through the bot's handlers.
+
+Start the bot with EVENT_CAPTURE_PATH=events.log.gz to record real traffic
+(each run writes its own events-<time>-<pid>.log.gz), then feed that log through on_message, on_presence_update, on_member_join and
+on_member_remove offline, against the fake Discord from bench.py. Guilds,
+channels and members are recreated from the IDs in the log, and the stickies
+and AFK users from its snapshot are set up before the first event.
+
+    python replay.py events-20240101-120000-1234.log.gz               # at the recorded pace
+    python replay.py events-20240101-120000-1234.log.gz --speed 10    # ten times faster
+    python replay.py events-20240101-120000-1234.log.gz --speed 0 --profile replay.prof
+    python replay.py events-20240101-120000-1234.log.gz --wait 5      # time to attach py-spy to the printed PID
+"""
+import argparse
+import asyncio
+import cProfile
+import json
+import os
+import pstats
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+# Keep the replay from touching the real database
+os.environ.setdefault('STATE_STORE', 'memory')
+
+import discord
+
+import bench
+import eventlog
+import main
+from bench import FakeChannel, FakeGateway, FakeGuild, FakeInteraction, FakeMessage, FakeRest, FakeUser
+
+
+class ReplayWorld:
+    """Fake guilds, channels and members, created the first time a captured event names them"""
+
+    def __init__(self, rest):
+        self.rest = rest
+        self.guilds = {}
+        self.members = {}  # {(guild_id, user_id): FakeUser}
+        self.channels = {}
+        # Notifications go to a channel of their own, as they would in production
+        self.notify_channel = FakeChannel(FakeGuild(rest, 0), rest, "notify", -1, channel_id=main.NOTIFY_CHANNEL_ID)
+        self.channels[self.notify_channel.id] = self.notify_channel
+
+    def guild(self, guild_id):
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = self.guilds[guild_id] = FakeGuild(self.rest, 0, guild_id=guild_id)
+        return guild
+
+    def channel(self, guild_id, channel_id):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            guild = self.guild(guild_id)
+            channel = FakeChannel(guild, self.rest, f"channel-{channel_id}", len(guild.text_channels), channel_id=channel_id)
+            guild.text_channels.append(channel)
+            guild.channels.append(channel)
+            guild._channels[channel_id] = channel
+            self.channels[channel_id] = channel
+        return channel
+
+    def member(self, guild_id, user_id, bot=False):
+        member = self.members.get((guild_id, user_id))
+        if member is None:
+            member = self.members[guild_id, user_id] = FakeUser(user_id, f"user-{user_id}", bot=bot)
+            member.guild = self.guild(guild_id)
+            member.guild.members.append(member)
+        return member
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+
+async def apply_snapshot(world, snapshot):
+    """Set up the stickies and AFK users the capture started with"""
+    admin = FakeUser(bench.next_id(), "admin", manage_messages=True)
+    for sticky in snapshot['stickies']:
+        if not sticky['active'] or sticky['guild_id'] is None:
+            continue
+        channel = world.channel(sticky['guild_id'], sticky['channel_id'])
+        for i in range(max(1, sticky['entries'])):
+            await main.stick_message.callback(
+                FakeInteraction(admin, channel), f"Replayed sticky #{i + 1}", add=i > 0,
+                quiet_period=sticky['quiet_period'], max_delay=sticky['max_delay'],
+                repost_after_messages=sticky['repost_after_messages'],
+                repost_after_seconds=sticky['repost_after_seconds'], delivery=sticky['delivery']
+            )
+    for user_id, guild_id in snapshot['afk']:
+        main.set_afk(user_id, "replayed", guild_id)
+
+
+async def dispatch_event(world, gateway, event, tasks):
+    """Feed one captured event to its handler; messages run concurrently, like the gateway does"""
+    kind = event[1]
+    if kind == eventlog.MESSAGE:
+        _, _, guild_id, channel_id, author_id, bot, webhook_id, mention_ids, length = event
+        if guild_id is None:
+            return False
+        message = FakeMessage(world.member(guild_id, author_id, bot=bot), world.channel(guild_id, channel_id),
+                              content="x" * length, mentions=[world.member(guild_id, user_id) for user_id in mention_ids])
+        message.webhook_id = webhook_id
+        task = asyncio.create_task(gateway.dispatch('on_message', main.on_message, message))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    elif kind == eventlog.PRESENCE:
+        _, _, guild_id, user_id, before_status, after_status = event
+        member = world.member(guild_id, user_id)
+        before = SimpleNamespace(status=discord.Status(before_status))
+        member.status = discord.Status(after_status)
+        await gateway.dispatch('on_presence_update', main.on_presence_update, before, member)
+    elif kind == eventlog.MEMBER_JOIN:
+        member = world.member(event[2], event[3])
+        await gateway.dispatch('on_member_join', main.on_member_join, member)
+    elif kind == eventlog.MEMBER_LEAVE:
+        member = world.member(event[2], event[3])
+        member.guild.members.remove(member)
+        del world.members[event[2], event[3]]
+        await gateway.dispatch('on_member_remove', main.on_member_remove, member)
+    elif kind == eventlog.AFK:
+        main.set_afk(event[3], "replayed", event[2])
+    else:
+        return False
+    return True
+
+
+async def run(args):
+    rest = FakeRest(args.latency / 1000, ratelimit_rate=args.ratelimit)
+    gateway = FakeGateway(main.bot)
+    gateway.connect(FakeUser(bench.next_id(), "StickyBot", bot=True))
+    world = ReplayWorld(rest)
+    # Handlers look channels up in the bot's cache, which here is the replay world
+    main.bot.get_channel = world.get_channel
+    main.notifier.get_channel = lambda: world.notify_channel
+
+    events = eventlog.read_events(args.log)
+    replayed = Counter()
+    skipped = 0
+    tasks = set()
+    profiler = cProfile.Profile() if args.profile or args.profile_top else None
+
+    if args.wait:
+        print(f"Replay PID {os.getpid()}, starting in {args.wait:g}s")
+        await asyncio.sleep(args.wait)
+
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        replay_started = loop.time()
+        for i, event in enumerate(events):
+            if args.limit and i >= args.limit:
+                break
+            if event[1] == eventlog.SNAPSHOT:
+                # A capture holds one snapshot, taken once its state was loaded
+                await apply_snapshot(world, event[2])
+                replayed[eventlog.SNAPSHOT] += 1
+                # Setting up does not eat into the recorded pace
+                replay_started = loop.time() - event[0] / 1000 / (args.speed or 1)
+                continue
+            if args.speed:
+                delay = replay_started + event[0] / 1000 / args.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif i % 100 == 0:
+                await asyncio.sleep(0)
+            if await dispatch_event(world, gateway, event, tasks):
+                replayed[event[1]] += 1
+            else:
+                skipped += 1
+        await asyncio.gather(*tasks)
+        await bench.drain()
+    finally:
+        if profiler:
+            profiler.disable()
+    elapsed = time.perf_counter() - started
+
+    if args.profile:
+        profiler.dump_stats(args.profile)
+    if args.profile_top:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(args.profile_top)
+
+    messages = replayed[eventlog.MESSAGE]
+    return {
+        'config': vars(args),
+        'events': dict(replayed),
+        'skipped_events': skipped,
+        'elapsed_seconds': round(elapsed, 3),
+        'messages_per_second': round(messages / elapsed, 1) if elapsed else None,
+        'rest_calls_per_message': round(rest.total_calls() / messages, 3) if messages else None,
+        'rest_calls': dict(rest.calls),
+        'rate_limited': rest.rate_limited,
+        'errors': dict(gateway.errors),
+        'handlers': bench.handler_stats(gateway),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a captured gateway event log against a fake Discord")
+    parser.add_argument('log', help="Event log written with EVENT_CAPTURE_PATH")
+    parser.add_argument('--speed', type=float, default=1.0, help="Multiple of the recorded pace (0 = as fast as possible)")
+    parser.add_argument('--limit', type=int, default=0, help="Stop after this many events (0 = all)")
+    parser.add_argument('--latency', type=float, default=30, help="Simulated REST latency in milliseconds")
+    parser.add_argument('--ratelimit', type=float, default=0.0, help="Probability that a REST call gets a 429")
+    parser.add_argument('--profile', help="Write cProfile stats for the replay to this file")
+    parser.add_argument('--profile-top', type=int, default=0, help="Print this many functions by cumulative time")
+    parser.add_argument('--wait', type=float, default=0, help="Seconds to wait before replaying, to attach a sampling profiler")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Events replayed:       {sum(report['events'].values())} ({report['skipped_events']} skipped)")
+        bench.print_report(report)
+
+
+if __name__ == '__main__':
+    main_cli()
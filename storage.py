@@ -0,0 +1,431 @@
+import asyncio
+import json
+import socket
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from urllib.parse import urlparse
+
+
+class StateStore:
+    """Base class for sticky message and AFK persistence backends.
+
+    Stores only see plain rows: stickies are {channel_id: dict} and AFK
+    entries are {user_id: {'reason': str, 'time': datetime, 'guild_id': int}}.
+    Writes arrive in batches where a value of None means the key was deleted.
+    """
+
+    def load_stickies(self):
+        return {}
+
+    def load_afk(self):
+        return {}
+
+    def load_sticky(self, channel_id):
+        return self.load_stickies().get(channel_id)
+
+    def load_afk_user(self, user_id):
+        return self.load_afk().get(user_id)
+
+    def write(self, stickies, afk):
+        pass
+
+    async def listen(self, callback):
+        """Call callback(sticky_keys, afk_keys) whenever another process changes state.
+
+        Both arguments are None when changes may have been missed and
+        everything should be re-read. Stores that only one process uses
+        never call it.
+        """
+
+    def close(self):
+        pass
+
+
+def _afk_to_json(info):
+    return json.dumps({'reason': info['reason'], 'time': info['time'].isoformat(), 'guild_id': info.get('guild_id')})
+
+
+def _afk_from_json(data):
+    info = json.loads(data)
+    info['time'] = datetime.fromisoformat(info['time'])
+    return info
+
+
+class MemoryStore(StateStore):
+    """Keeps rows in this process only, for development and tests"""
+
+    def __init__(self):
+        self.stickies = {}
+        self.afk = {}
+
+    def load_stickies(self):
+        return {channel_id: json.loads(data) for channel_id, data in self.stickies.items()}
+
+    def load_afk(self):
+        return {user_id: _afk_from_json(data) for user_id, data in self.afk.items()}
+
+    def load_sticky(self, channel_id):
+        data = self.stickies.get(channel_id)
+        return json.loads(data) if data is not None else None
+
+    def load_afk_user(self, user_id):
+        data = self.afk.get(user_id)
+        return _afk_from_json(data) if data is not None else None
+
+    def write(self, stickies, afk):
+        for channel_id, data in stickies.items():
+            if data is None:
+                self.stickies.pop(channel_id, None)
+            else:
+                self.stickies[channel_id] = data
+        for user_id, info in afk.items():
+            if info is None:
+                self.afk.pop(user_id, None)
+            else:
+                self.afk[user_id] = _afk_to_json(info)
+
+
+class SQLiteStore(StateStore):
+    """SQLite backed store, the default"""
+
+    def __init__(self, path):
+        # Writes happen on a worker thread, loads on whichever thread asks
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS stickies (channel_id INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS afk_users (user_id INTEGER PRIMARY KEY, reason TEXT NOT NULL, time TEXT NOT NULL, guild_id INTEGER)"
+        )
+        # Databases created before AFK entries were partitioned by guild
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(afk_users)")}
+        if 'guild_id' not in columns:
+            self.conn.execute("ALTER TABLE afk_users ADD COLUMN guild_id INTEGER")
+        self.conn.commit()
+
+    def load_stickies(self):
+        rows = self.conn.execute("SELECT channel_id, data FROM stickies").fetchall()
+        return {channel_id: json.loads(data) for channel_id, data in rows}
+
+    def load_afk(self):
+        rows = self.conn.execute("SELECT user_id, reason, time, guild_id FROM afk_users").fetchall()
+        return {
+            user_id: {'reason': reason, 'time': datetime.fromisoformat(time), 'guild_id': guild_id}
+            for user_id, reason, time, guild_id in rows
+        }
+
+    def load_sticky(self, channel_id):
+        row = self.conn.execute("SELECT data FROM stickies WHERE channel_id = ?", (channel_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_afk_user(self, user_id):
+        row = self.conn.execute(
+            "SELECT reason, time, guild_id FROM afk_users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        reason, time, guild_id = row
+        return {'reason': reason, 'time': datetime.fromisoformat(time), 'guild_id': guild_id}
+
+    def write(self, stickies, afk):
+        sticky_upserts = [(key, data) for key, data in stickies.items() if data is not None]
+        sticky_deletes = [(key,) for key, data in stickies.items() if data is None]
+        afk_upserts = [
+            (key, info['reason'], info['time'].isoformat(), info.get('guild_id'))
+            for key, info in afk.items() if info is not None
+        ]
+        afk_deletes = [(key,) for key, info in afk.items() if info is None]
+
+        with self.conn:
+            if sticky_upserts:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO stickies (channel_id, data) VALUES (?, ?)", sticky_upserts
+                )
+            if sticky_deletes:
+                self.conn.executemany("DELETE FROM stickies WHERE channel_id = ?", sticky_deletes)
+            if afk_upserts:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO afk_users (user_id, reason, time, guild_id) VALUES (?, ?, ?, ?)", afk_upserts
+                )
+            if afk_deletes:
+                self.conn.executemany("DELETE FROM afk_users WHERE user_id = ?", afk_deletes)
+
+    def close(self):
+        self.conn.close()
+
+
+class KVError(Exception):
+    """Error reply from a key-value server"""
+
+
+def _encode_command(*args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def _read_reply(readline, read):
+    """Parse one RESP reply from blocking line and byte readers"""
+    line = readline()
+    if not line:
+        raise ConnectionError("Key-value server closed the connection")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest.decode()
+    if kind == b'-':
+        raise KVError(rest.decode())
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        length = int(rest)
+        return None if length < 0 else read(length + 2)[:-2]
+    if kind == b'*':
+        length = int(rest)
+        return None if length < 0 else [_read_reply(readline, read) for _ in range(length)]
+    raise KVError(f"Unexpected reply: {line!r}")
+
+
+async def _read_reply_async(reader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Key-value server closed the connection")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'*':
+        length = int(rest)
+        return None if length < 0 else [await _read_reply_async(reader) for _ in range(length)]
+    if kind == b'$':
+        length = int(rest)
+        return None if length < 0 else (await reader.readexactly(length + 2))[:-2]
+    return _read_reply(lambda: line, reader.read)
+
+
+class KVStore(StateStore):
+    """Store shared by several bot processes through a Redis-protocol server.
+
+    Stickies and AFK entries live in two hashes under a key prefix. Every
+    write also publishes the changed keys on an invalidation channel so the
+    other processes can re-read them; see kvserver.py for a local stand-in.
+    """
+
+    def __init__(self, url, prefix='stickybot'):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.stickies_key = f'{prefix}:stickies'
+        self.afk_key = f'{prefix}:afk'
+        self.channel = f'{prefix}:invalidate'
+        # Lets listeners skip the invalidations this process published itself
+        self.origin = uuid.uuid4().hex
+        self.lock = threading.Lock()
+        self.sock = None
+        self.file = None
+
+    def _handshake(self):
+        commands = []
+        if self.password:
+            commands.append(('AUTH', self.password))
+        if self.db:
+            commands.append(('SELECT', self.db))
+        return commands
+
+    def _connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=10)
+        self.file = self.sock.makefile('rb')
+        for command in self._handshake():
+            self.sock.sendall(_encode_command(*command))
+            _read_reply(self.file.readline, self.file.read)
+
+    def _disconnect(self):
+        if self.sock is not None:
+            self.file.close()
+            self.sock.close()
+        self.sock = self.file = None
+
+    def execute(self, *commands):
+        """Send commands as one pipeline and return their replies"""
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.sock is None:
+                        self._connect()
+                    self.sock.sendall(b''.join(_encode_command(*command) for command in commands))
+                    replies = []
+                    for _ in commands:
+                        try:
+                            replies.append(_read_reply(self.file.readline, self.file.read))
+                        except KVError as e:
+                            replies.append(e)
+                    break
+                except OSError:
+                    # The connection may have gone stale while idle, retry once on a fresh one
+                    self._disconnect()
+                    if attempt:
+                        raise
+        for reply in replies:
+            if isinstance(reply, KVError):
+                raise reply
+        return replies
+
+    def load_stickies(self):
+        items = self.execute(('HGETALL', self.stickies_key))[0]
+        return {int(items[i]): json.loads(items[i + 1]) for i in range(0, len(items), 2)}
+
+    def load_afk(self):
+        items = self.execute(('HGETALL', self.afk_key))[0]
+        return {int(items[i]): _afk_from_json(items[i + 1]) for i in range(0, len(items), 2)}
+
+    def load_sticky(self, channel_id):
+        data = self.execute(('HGET', self.stickies_key, channel_id))[0]
+        return json.loads(data) if data is not None else None
+
+    def load_afk_user(self, user_id):
+        data = self.execute(('HGET', self.afk_key, user_id))[0]
+        return _afk_from_json(data) if data is not None else None
+
+    def write(self, stickies, afk):
+        commands = []
+        sticky_upserts = [part for key, data in stickies.items() if data is not None for part in (key, data)]
+        sticky_deletes = [key for key, data in stickies.items() if data is None]
+        afk_upserts = [part for key, info in afk.items() if info is not None for part in (key, _afk_to_json(info))]
+        afk_deletes = [key for key, info in afk.items() if info is None]
+        if sticky_upserts:
+            commands.append(('HSET', self.stickies_key, *sticky_upserts))
+        if sticky_deletes:
+            commands.append(('HDEL', self.stickies_key, *sticky_deletes))
+        if afk_upserts:
+            commands.append(('HSET', self.afk_key, *afk_upserts))
+        if afk_deletes:
+            commands.append(('HDEL', self.afk_key, *afk_deletes))
+        if not commands:
+            return
+        message = {'origin': self.origin, 'stickies': list(stickies), 'afk': list(afk)}
+        commands.append(('PUBLISH', self.channel, json.dumps(message)))
+        self.execute(*commands)
+
+    async def listen(self, callback, retry_delay=5.0):
+        reconnecting = False
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                for command in self._handshake():
+                    writer.write(_encode_command(*command))
+                    await _read_reply_async(reader)
+                writer.write(_encode_command('SUBSCRIBE', self.channel))
+                await writer.drain()
+                await _read_reply_async(reader)
+                if reconnecting:
+                    # Anything published while we were disconnected is lost
+                    callback(None, None)
+                reconnecting = True
+                while True:
+                    reply = await _read_reply_async(reader)
+                    if reply[0] != b'message':
+                        continue
+                    message = json.loads(reply[2])
+                    if message['origin'] != self.origin:
+                        callback(message['stickies'], message['afk'])
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, KVError) as e:
+                print(f"Lost the state invalidation channel ({e}), reconnecting in {retry_delay:g}s")
+            finally:
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(retry_delay)
+
+    def close(self):
+        with self.lock:
+            self._disconnect()
+
+
+STORE_BACKENDS = {
+    'sqlite': SQLiteStore,
+    'memory': lambda path: MemoryStore(),
+    'kv': KVStore,
+}
+
+
+def open_store(backend, path):
+    """Open a persistence backend by name"""
+    try:
+        factory = STORE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown state store backend: {backend!r}") from None
+    return factory(path)
+
+
+def serialize_sticky(sticky_data):
+    """Serialize a sticky for storage, skipping transient '_' prefixed keys"""
+    return json.dumps({key: value for key, value in sticky_data.items() if not key.startswith('_')})
+
+
+class WriteBehind:
+    """Batches state changes and writes them to a store in the background.
+
+    Callers mark keys as dirty; the live dicts stay the source of truth and
+    are read at flush time, so many changes to one key collapse into a
+    single write. AFK values are records that turn themselves into rows
+    with to_row().
+    """
+
+    def __init__(self, store, stickies, afk, interval=2.0):
+        self.store = store
+        self.stickies = stickies
+        self.afk = afk
+        self.interval = interval
+        self.dirty_stickies = set()
+        self.dirty_afk = set()
+        self.task = None
+
+    def mark_sticky(self, channel_id):
+        self.dirty_stickies.add(channel_id)
+
+    def mark_afk(self, user_id):
+        self.dirty_afk.add(user_id)
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def _take_batch(self):
+        stickies = {}
+        for channel_id in self.dirty_stickies:
+            data = self.stickies.get(channel_id)
+            stickies[channel_id] = serialize_sticky(data) if data is not None else None
+        afk = {}
+        for user_id in self.dirty_afk:
+            info = self.afk.get(user_id)
+            afk[user_id] = info.to_row() if info is not None else None
+        self.dirty_stickies = set()
+        self.dirty_afk = set()
+        return stickies, afk
+
+    async def flush(self):
+        if not self.dirty_stickies and not self.dirty_afk:
+            return
+        stickies, afk = self._take_batch()
+        try:
+            await asyncio.to_thread(self.store.write, stickies, afk)
+        except Exception as e:
+            # Put the keys back so the next flush retries them
+            self.dirty_stickies.update(stickies)
+            self.dirty_afk.update(afk)
+            print(f"Failed to persist state: {e}")
+
+    def flush_now(self):
+        """Synchronously write everything pending, used at shutdown"""
+        if self.dirty_stickies or self.dirty_afk:
+            self.store.write(*self._take_batch())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
@@ -0,0 +1,31 @@
+from afkstore import AFKRecord, AFKStore
+
+
+def make_store(*sinces, ttl=100):
+    store = AFKStore(ttl=ttl)
+    store.load({user_id: AFKRecord("away", since) for user_id, since in enumerate(sinces)})
+    return store
+
+
+def test_expired_stops_at_first_fresh_record():
+    store = make_store(10, 20, 500, 600)
+    assert store.expired(now=550) == [0, 1]
+
+
+def test_load_keeps_order_when_older_records_arrive_later():
+    store = make_store(500, 600)
+    # A full resync brings back a stale record behind fresh ones
+    store.load({7: AFKRecord("away", 10)})
+    assert list(store) == [7, 0, 1]
+    assert store.expired(now=550) == [7]
+
+
+def test_load_moves_a_reloaded_user():
+    store = make_store(10, 500)
+    store.load({0: AFKRecord("back again", 700)})
+    assert list(store) == [1, 0]
+    assert store.expired(now=550) == []
+
+
+def test_no_ttl_never_expires():
+    assert make_store(10, ttl=0).expired(now=10 ** 9) == []
@@ -0,0 +1,44 @@
+import logging
+
+import metrics
+
+URL = 'https://discord.com/api/v10/channels/123456789012345678/messages'
+
+
+def counted(logger, fmt, *args):
+    metrics.rate_limits.values.clear()
+    metrics.global_rate_limits.values.clear()
+    handler = metrics.RateLimitLogHandler(logging.WARNING)
+    record = logging.getLogger(logger).makeRecord(logger, logging.WARNING, __file__, 0, fmt, args, None)
+    handler.handle(record)
+    return dict(metrics.rate_limits.values), metrics.global_rate_limits.total()
+
+
+def test_route_429_is_counted_under_its_route():
+    fmt = 'We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.'
+    assert counted('discord.http', fmt, 'POST', URL, 1.5) == ({('POST /channels/{id}/messages',): 1}, 0)
+
+
+def test_429_raised_instead_of_retried_is_not_counted():
+    fmt = 'We are being rate limited. %s %s responded with 429. Timeout of %.2f was too long, erroring instead.'
+    assert counted('discord.http', fmt, 'POST', URL, 90.0) == ({}, 0)
+
+
+def test_global_rate_limit_is_counted():
+    assert counted('discord.http', 'Global rate limit has been hit. Retrying in %.2f seconds.', 1.5) == ({}, 1)
+
+
+def test_webhook_429_is_counted():
+    fmt = 'Webhook ID %s is rate limited. Retrying in %.2f seconds.'
+    assert counted('discord.webhook.async_', fmt, 123456789012345678, 1.5) == ({('webhook',): 1}, 0)
+
+
+def test_route_label_hides_ids_and_tokens():
+    url = 'https://discord.com/api/v10/webhooks/123456789012345678/s3cr3t-token/messages/123456789012345679?wait=true'
+    assert metrics.route_label('PATCH', url) == 'PATCH /webhooks/{id}/{token}/messages/{id}'
+
+
+def test_install_hooks_the_http_and_webhook_loggers():
+    metrics.install_rate_limit_counter()
+    for logger in ('discord.http', 'discord.webhook.async_'):
+        assert any(isinstance(h, metrics.RateLimitLogHandler) for h in logging.getLogger(logger).handlers)
@@ -0,0 +1,89 @@
+import asyncio
+
+from notifier import PresenceDebouncer
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_debouncer(window=5.0, dedup_ttl=60.0):
+    clock = FakeClock()
+    emitted = []
+    debouncer = PresenceDebouncer(lambda member, online: emitted.append((member, online)),
+                                  window=window, dedup_ttl=dedup_ttl, clock=clock)
+    return debouncer, clock, emitted
+
+
+def close_window(debouncer, clock, user_id):
+    # Stands in for the wheel firing the user's timer once the window has passed
+    clock.now = debouncer.timers.when(user_id)
+    debouncer.timers.cancel(user_id)
+    debouncer._close(user_id)
+
+
+def run(body):
+    async def main():
+        body()
+    asyncio.run(main())
+
+
+def test_copies_from_other_guilds_collapse_into_one_notice():
+    def body():
+        debouncer, clock, emitted = make_debouncer()
+        for guild in range(5):
+            debouncer.update(1, False, True, f"member@{guild}")
+        close_window(debouncer, clock, 1)
+        assert emitted == [("member@4", True)]
+        assert debouncer.suppressed['duplicate'] == 4
+    run(body)
+
+
+def test_flap_inside_window_emits_nothing():
+    def body():
+        debouncer, clock, emitted = make_debouncer()
+        debouncer.update(1, False, True, "member")
+        debouncer.update(1, True, False, "member")
+        close_window(debouncer, clock, 1)
+        assert emitted == []
+        assert debouncer.suppressed['flap'] == 1
+    run(body)
+
+
+def test_late_copy_of_emitted_notice_is_dropped_until_ttl():
+    def body():
+        debouncer, clock, emitted = make_debouncer()
+        debouncer.update(1, False, True, "member")
+        close_window(debouncer, clock, 1)
+        clock.now += 30
+        debouncer.update(1, False, True, "member")
+        assert 1 not in debouncer.pending
+        clock.now += 31
+        debouncer.update(1, False, True, "member")
+        assert 1 in debouncer.pending
+        assert emitted == [("member", True)]
+    run(body)
+
+
+def test_opposite_transition_is_not_deduplicated():
+    def body():
+        debouncer, clock, emitted = make_debouncer()
+        debouncer.update(1, False, True, "member")
+        close_window(debouncer, clock, 1)
+        debouncer.update(1, True, False, "member")
+        close_window(debouncer, clock, 1)
+        assert emitted == [("member", True), ("member", False)]
+    run(body)
+
+
+def test_zero_window_emits_immediately():
+    debouncer, clock, emitted = make_debouncer(window=0)
+    debouncer.update(1, False, True, "member")
+    debouncer.update(1, False, True, "member")
+    assert emitted == [("member", True)]
+    assert not debouncer.pending
+    assert debouncer.suppressed['duplicate'] == 1
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+from outbound import PRIORITY_AFK, PRIORITY_COMMAND, OutboundQueue, Superseded, TokenBucket
+
+
+def run(body):
+    asyncio.run(body())
+
+
+def recorder(started, name):
+    async def factory():
+        started.append((name, time.monotonic()))
+        return name
+    return factory
+
+
+def test_requests_respect_the_bucket_rate():
+    started = []
+
+    async def body():
+        queue = OutboundQueue({'send': (2, 0.2)})
+        begin = time.monotonic()
+        await asyncio.gather(*(queue.submit(PRIORITY_AFK, 'send', 1, recorder(started, i)) for i in range(6)))
+        # Two at once, then one per 0.1s as tokens refill
+        offsets = [at - begin for _, at in started]
+        assert offsets[1] < 0.05
+        assert offsets[5] >= 0.38
+
+    run(body)
+    assert [name for name, _ in started] == list(range(6))
+
+
+def test_parked_requests_keep_priority_order():
+    started = []
+
+    async def body():
+        queue = OutboundQueue({'send': (1, 0.1)})
+        futures = [queue.submit(PRIORITY_AFK, 'send', 1, recorder(started, f"afk{i}")) for i in range(3)]
+        # afk0 takes the only token, the other replies park behind it
+        await futures[0]
+        futures.append(queue.submit(PRIORITY_COMMAND, 'send', 1, recorder(started, "command")))
+        await asyncio.gather(*futures)
+
+    run(body)
+    # The command still jumps the parked AFK replies
+    assert [name for name, _ in started] == ["afk0", "command", "afk1", "afk2"]
+
+
+def test_cancelled_caller_is_never_sent():
+    started = []
+
+    async def body():
+        queue = OutboundQueue({'send': (1, 0.1)})
+        await queue.submit(PRIORITY_AFK, 'send', 1, recorder(started, "first"))
+        waiter = asyncio.create_task(asyncio.wait_for(queue.submit(PRIORITY_AFK, 'send', 1, recorder(started, "cancelled"), tag='t'), 10))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.3)
+        assert 't' not in queue.tagged
+        assert len(queue) == 0
+
+    run(body)
+    assert [name for name, _ in started] == ["first"]
+
+
+def test_supersede_drops_parked_requests():
+    started = []
+
+    async def body():
+        queue = OutboundQueue({'send': (1, 0.1)})
+        first = queue.submit(PRIORITY_AFK, 'send', 1, recorder(started, "first"), tag='sticky')
+        second = queue.submit(PRIORITY_AFK, 'send', 1, recorder(started, "second"), tag='sticky')
+        await first
+        queue.supersede('sticky')
+        try:
+            await second
+        except Superseded:
+            pass
+        else:
+            raise AssertionError("second should have been superseded")
+        await asyncio.sleep(0.2)
+
+    run(body)
+    assert [name for name, _ in started] == ["first"]
+
+
+def test_backlog_behind_one_bucket_is_not_rescanned(monkeypatch):
+    takes = 0
+    try_take = TokenBucket.try_take
+
+    def counting_try_take(self, now):
+        nonlocal takes
+        takes += 1
+        return try_take(self, now)
+
+    monkeypatch.setattr(TokenBucket, 'try_take', counting_try_take)
+
+    async def body():
+        queue = OutboundQueue({'send': (1, 60.0)})
+        backlog = [queue.submit(PRIORITY_AFK, 'send', 'busy', recorder([], i)) for i in range(2000)]
+        # Other channels keep flowing while the busy one waits
+        await asyncio.gather(*(queue.submit(PRIORITY_AFK, 'send', other, recorder([], other)) for other in range(200)))
+        assert len(queue) == 1999
+        for future in backlog:
+            future.cancel()
+
+    run(body)
+    # Each request is looked at a bounded number of times, not once per dispatch
+    assert takes < 3 * 2200
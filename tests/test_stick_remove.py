@@ -0,0 +1,57 @@
+import asyncio
+import os
+
+# Keep main from opening the real database
+os.environ.setdefault('STATE_STORE', 'memory')
+
+import bench
+import main
+from outbound import OutboundQueue
+
+
+def run_in_channel(body):
+    async def runner():
+        rest = bench.FakeRest(0)
+        guild = bench.FakeGuild(rest, 1)
+        channel = guild.text_channels[0]
+        main.bot.get_channel = guild.get_channel
+        # The queue's wakeup event belongs to the loop it first ran on
+        main.outbound = OutboundQueue(main.OUTBOUND_ROUTE_LIMITS)
+        admin = bench.FakeUser(bench.next_id(), "admin", manage_messages=True)
+        try:
+            await body(channel, lambda: bench.FakeInteraction(admin, channel))
+        finally:
+            await bench.drain()
+            main.sticky_messages.pop(channel.id, None)
+    asyncio.run(runner())
+
+
+def test_wrong_id_leaves_a_single_sticky_alone():
+    async def body(channel, interaction):
+        await main.stick_message.callback(interaction(), "Read the rules")
+        [entry] = main.sticky_messages[channel.id]['entries']
+        await main.stick_remove.callback(interaction(), sticky_id=entry['id'] + 1)
+        assert [e['id'] for e in main.sticky_messages[channel.id]['entries']] == [entry['id']]
+
+    run_in_channel(body)
+
+
+def test_matching_id_removes_a_single_sticky():
+    async def body(channel, interaction):
+        await main.stick_message.callback(interaction(), "Read the rules")
+        [entry] = main.sticky_messages[channel.id]['entries']
+        await main.stick_remove.callback(interaction(), sticky_id=entry['id'])
+        assert channel.id not in main.sticky_messages
+
+    run_in_channel(body)
+
+
+def test_matching_id_removes_one_of_several_stickies():
+    async def body(channel, interaction):
+        await main.stick_message.callback(interaction(), "Read the rules")
+        await main.stick_message.callback(interaction(), "No spoilers", add=True)
+        first, second = main.sticky_messages[channel.id]['entries']
+        await main.stick_remove.callback(interaction(), sticky_id=first['id'])
+        assert [e['id'] for e in main.sticky_messages[channel.id]['entries']] == [second['id']]
+
+    run_in_channel(body)
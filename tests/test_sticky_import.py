@@ -0,0 +1,102 @@
+import json
+import os
+import time
+
+import pytest
+
+# Keep main from opening the real database
+os.environ.setdefault('STATE_STORE', 'memory')
+
+import bench
+import main
+
+
+@pytest.fixture
+def guild():
+    return bench.FakeGuild(bench.FakeRest(0), 2)
+
+
+def parse(guild, *stickies):
+    return main.parse_sticky_import(guild, {'version': main.STICKY_EXPORT_VERSION, 'stickies': list(stickies)})
+
+
+def sticky(**overrides):
+    data = {'channel_name': 'channel-0', 'entries': [{'message': 'Read the rules'}]}
+    data.update(overrides)
+    return data
+
+
+def test_valid_sticky_is_imported(guild):
+    imported, problems = parse(guild, sticky(quiet_period=2, active=False))
+    assert problems == []
+    [(channel, sticky_data)] = imported
+    assert channel is guild.text_channels[0]
+    assert sticky_data['active'] is False
+    assert sticky_data['quiet_period'] == 2.0
+    assert [entry['message'] for entry in sticky_data['entries']] == ['Read the rules']
+
+
+def test_payload_that_is_not_an_export_is_rejected(guild):
+    with pytest.raises(ValueError):
+        main.parse_sticky_import(guild, {'version': main.STICKY_EXPORT_VERSION, 'stickies': {}})
+
+
+@pytest.mark.parametrize('bad', [1, 'channel-0', None, ['channel-0']])
+def test_non_object_sticky_is_a_problem(guild, bad):
+    imported, problems = parse(guild, bad, sticky())
+    assert len(imported) == 1
+    assert problems == ["#1: invalid sticky (not an object)"]
+
+
+@pytest.mark.parametrize('entries', [[1], ['Read the rules'], [None], 'Read the rules', [{'message': ''}], [{}]])
+def test_bad_entries_are_a_problem(guild, entries):
+    imported, problems = parse(guild, sticky(entries=entries))
+    assert imported == []
+    assert len(problems) == 1 and problems[0].startswith("#1: invalid sticky")
+
+
+@pytest.mark.parametrize('key', ['starts_at', 'expires_at'])
+@pytest.mark.parametrize('value', [float('inf'), float('-inf'), float('nan'), 'inf', '1700000000', True, 10 ** 12, -5])
+def test_bad_timestamps_are_a_problem(guild, key, value):
+    imported, problems = parse(guild, sticky(entries=[{'message': 'hi', key: value}]))
+    assert imported == []
+    assert len(problems) == 1 and problems[0].startswith("#1: invalid sticky")
+
+
+def test_infinity_from_json_is_a_problem(guild):
+    payload = json.loads('{"version": %d, "stickies": [{"channel_name": "channel-0", '
+                         '"entries": [{"message": "hi", "starts_at": Infinity}]}]}' % main.STICKY_EXPORT_VERSION)
+    imported, problems = main.parse_sticky_import(guild, payload)
+    assert imported == []
+    assert problems == ["#1: invalid sticky (starts_at must be a timestamp)"]
+
+
+def test_scheduled_entries_keep_their_times(guild):
+    now = time.time()
+    imported, problems = parse(guild, sticky(entries=[{'message': 'later', 'starts_at': now + 60, 'expires_at': now + 120}]))
+    assert problems == []
+    [entry] = imported[0][1]['entries']
+    assert entry['starts_at'] == now + 60 and entry['expires_at'] == now + 120
+
+
+def test_entry_expiring_before_it_starts_is_a_problem(guild):
+    now = time.time()
+    _, problems = parse(guild, sticky(entries=[{'message': 'hi', 'starts_at': now + 120, 'expires_at': now + 60}]))
+    assert problems == ["#1: invalid sticky (entry expires before it starts)"]
+
+
+@pytest.mark.parametrize('overrides, error', [
+    ({'active': 'false'}, "active must be true or false"),
+    ({'quiet_period': '3'}, "quiet_period must be a number"),
+    ({'max_delay': 10 ** 9}, "max_delay must be between 0 and 600"),
+    ({'repost_after_messages': 2.5}, "repost_after_messages must be a whole number"),
+    ({'delivery': 'carrier pigeon'}, "unknown delivery 'carrier pigeon'"),
+])
+def test_bad_settings_are_a_problem(guild, overrides, error):
+    _, problems = parse(guild, sticky(**overrides))
+    assert problems == [f"#1: invalid sticky ({error})"]
+
+
+def test_missing_channel_is_a_problem(guild):
+    _, problems = parse(guild, sticky(channel_name='nope', channel_id=123))
+    assert problems == ["#1: no channel `nope` in this server"]
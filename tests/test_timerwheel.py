@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+from timerwheel import TimerWheel
+
+
+def run_wheel(body, tick=0.01, slots=512):
+    fired = []
+
+    async def main():
+        wheel = TimerWheel(lambda key: fired.append((key, time.monotonic())), tick=tick, slots=slots, clock=time.monotonic)
+        await body(wheel)
+
+    asyncio.run(main())
+    return fired
+
+
+def test_timer_never_fires_early():
+    whens = {}
+
+    async def body(wheel):
+        now = time.monotonic()
+        # Spread across slot boundaries, so some deadlines fall inside a tick
+        for i in range(20):
+            whens[i] = now + 0.003 * i + 0.001
+            wheel.schedule(i, whens[i])
+        await asyncio.sleep(0.2)
+
+    fired = run_wheel(body)
+    assert sorted(key for key, _ in fired) == list(range(20))
+    for key, fired_at in fired:
+        assert fired_at >= whens[key]
+
+
+def test_past_deadline_fires_on_next_tick():
+    async def body(wheel):
+        wheel.schedule('late', time.monotonic() - 5)
+        await asyncio.sleep(0.05)
+
+    assert [key for key, _ in run_wheel(body)] == ['late']
+
+
+def test_reschedule_replaces_and_cancel_drops():
+    async def body(wheel):
+        now = time.monotonic()
+        wheel.schedule('a', now + 0.01)
+        wheel.schedule('a', now + 0.05)
+        assert wheel.when('a') == now + 0.05
+        wheel.schedule('b', now + 0.02)
+        wheel.cancel('b')
+        assert len(wheel) == 1
+        await asyncio.sleep(0.03)
+        assert len(wheel) == 1
+        await asyncio.sleep(0.1)
+        assert len(wheel) == 0
+
+    assert [key for key, _ in run_wheel(body)] == ['a']
+
+
+def test_catches_up_after_blocking_longer_than_a_turn():
+    async def body(wheel):
+        now = time.monotonic()
+        for i in range(10):
+            wheel.schedule(i, now + 0.01 * (i + 1))
+        await asyncio.sleep(0)
+        # Block the loop for several full turns of an 8-slot wheel
+        time.sleep(0.3)
+        await asyncio.sleep(0.05)
+
+    fired = run_wheel(body, slots=8)
+    assert sorted(key for key, _ in fired) == list(range(10))
+
+
+def test_idle_wheel_resumes_on_schedule():
+    async def body(wheel):
+        wheel.schedule('first', time.monotonic())
+        await asyncio.sleep(0.05)
+        # The wheel has gone idle; a new timer must still fire on time
+        await asyncio.sleep(0.05)
+        wheel.schedule('second', time.monotonic() + 0.02)
+        await asyncio.sleep(0.08)
+
+    assert [key for key, _ in run_wheel(body)] == ['first', 'second']
@@ -0,0 +1,82 @@
+import asyncio
+import math
+import time
+
+
+class TimerWheel:
+    """Hashed timer wheel that drives any number of timers from a single task.
+
+    Each key has at most one pending timer; scheduling a key again replaces
+    its previous timer. The wheel only ticks while timers are pending, so an
+    idle wheel costs nothing, and a tick only looks at the timers hashed to
+    the current slot.
+    """
+
+    def __init__(self, callback, tick=1.0, slots=512, clock=time.time):
+        self.callback = callback
+        self.tick = tick
+        self.slots = slots
+        self.clock = clock
+        self.wheel = [{} for _ in range(slots)]
+        self.timers = {}  # {key: (when, slot)}
+        self.current = None  # next tick number to process
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def __len__(self):
+        return len(self.timers)
+
+    def schedule(self, key, when):
+        """Call callback(key) at wall-clock time when"""
+        self.cancel(key)
+        if self.current is None or not self.timers:
+            # The wheel was idle, so it has not been tracking the clock
+            self.current = int(self.clock() // self.tick)
+        # Round up so the timer's slot is processed no earlier than when;
+        # timers already due go in the next slot to be processed
+        tick = max(math.ceil(when / self.tick), self.current)
+        slot = tick % self.slots
+        self.wheel[slot][key] = when
+        self.timers[key] = (when, slot)
+        self.wakeup.set()
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def cancel(self, key):
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            self.wheel[timer[1]].pop(key, None)
+
+    def when(self, key):
+        timer = self.timers.get(key)
+        return timer[0] if timer else None
+
+    def _fire(self, tick, now):
+        slot = self.wheel[tick % self.slots]
+        due = [key for key, when in slot.items() if when <= now]
+        for key in due:
+            del slot[key]
+            del self.timers[key]
+        for key in due:
+            try:
+                self.callback(key)
+            except Exception as e:
+                print(f"Timer callback for {key!r} failed: {e}")
+
+    async def _run(self):
+        while True:
+            if not self.timers:
+                # Nothing pending, sleep until something is scheduled
+                self.wakeup.clear()
+                await self.wakeup.wait()
+
+            now = self.clock()
+            now_tick = int(now // self.tick)
+            # Catch up on ticks missed while the loop was busy, at most one full turn
+            first = max(self.current, now_tick - self.slots + 1)
+            for tick in range(first, now_tick + 1):
+                self._fire(tick, now)
+            self.current = now_tick + 1
+
+            if self.timers:
+                await asyncio.sleep(max(0.0, self.current * self.tick - self.clock()))